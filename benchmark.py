@@ -0,0 +1,378 @@
+# 性能基准：无需浏览器，分规模测量模型加载、特征编码、单条/批量预测、数据加载与聚合等热点路径，结果写入JSON并与基线比较
+import argparse
+import gc
+import io
+import json
+import os
+import pickle
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from bitmap_filter import BitmapIndex
+from feature_encoding import encoder_for
+from forest_quantiles import predict_with_quantiles
+from insurance_model import CATEGORICAL_COLUMNS as INSURANCE_CATEGORICAL
+from insurance_model import MODEL_PATH as INSURANCE_MODEL_PATH
+from packed_forest import PackedForest, pack_forest
+from packed_forest import loads as load_packed_bytes
+from parallel_agg import default_workers
+from penguin_batch import sniff_encoding
+from penguin_model import CATEGORICAL_COLUMNS as PENGUIN_CATEGORICAL
+from penguin_model import MODEL_PATH as PENGUIN_MODEL_PATH
+from sales_cube import FILTER_DIMENSIONS, build_cube
+from sales_data import load_sales_data
+from student_data import CSV_PATH as STUDENT_CSV_PATH
+from student_data import parse_csv
+from student_model import fit_model
+from student_stats import build_major_stats
+
+PENGUIN_CSV_PATH = 'penguins-chinese.csv'
+INSURANCE_CSV_PATH = '（医疗费用预测数据）insurance-chinese.csv'
+
+SCALES = (1_000, 100_000, 10_000_000)  # 合成数据的行数
+REPEATS = 5          # 单次耗时不足 MIN_REPEAT_SECONDS 时的重复次数（取中位数）
+MIN_REPEAT_SECONDS = 1.0
+SINGLE_CALLS = 200   # 单条预测基准的调用次数
+MAX_SLOWDOWN = 1.5   # 中位数耗时超过基线的倍数即视为性能回退
+DEFAULT_OUTPUT = 'benchmark_results.json'
+
+BENCHMARKS = []  # [(名称, 是否随数据规模变化, 准备函数)]
+
+
+class SkipBenchmark(Exception):
+    """缺少模型文件等原因无法运行的基准"""
+
+
+def benchmark(name, scaled=True):
+    """登记一个基准：准备函数接收 (Fixtures, 行数)，返回不带参数的被测函数（准备过程不计时）"""
+    def register(setup):
+        BENCHMARKS.append((name, scaled, setup))
+        return setup
+    return register
+
+
+def read_source_csv(path):
+    with open(path, 'rb') as f:
+        encoding = sniff_encoding(f.read(65536))
+    return pd.read_csv(path, encoding=encoding)
+
+
+class Fixtures:
+    """基准用的数据：原始数据只读取一次，各规模的合成数据由原始数据有放回抽样得到"""
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self._sources = {}
+        self._synthetic = {}
+        self.tmpdir = tempfile.mkdtemp(prefix='benchmark_')
+
+    def source(self, name):
+        if name not in self._sources:
+            loaders = {
+                'penguin': lambda: read_source_csv(PENGUIN_CSV_PATH).dropna(),
+                'insurance': lambda: read_source_csv(INSURANCE_CSV_PATH),
+                'student': lambda: parse_csv(STUDENT_CSV_PATH),
+                'sales': load_sales_data,
+            }
+            self._sources[name] = loaders[name]()
+        return self._sources[name]
+
+    def synthetic(self, name, n_rows):
+        """n_rows 行的合成数据（分类列保持原始取值，数值列与原始分布一致）"""
+        key = (name, n_rows)
+        if key not in self._synthetic:
+            source = self.source(name)
+            rows = np.random.default_rng(self.seed).integers(0, len(source), n_rows)
+            self._synthetic[key] = source.take(rows).reset_index(drop=True)
+        return self._synthetic[key]
+
+    def student_csv(self, n_rows):
+        """把合成学生数据写成CSV，供解析基准使用"""
+        path = os.path.join(self.tmpdir, f'student_{n_rows}.csv')
+        if not os.path.exists(path):
+            self.synthetic('student', n_rows).to_csv(path, index=False)
+        return path
+
+    def release(self, n_rows):
+        """某个规模测完后释放对应的合成数据和临时文件"""
+        self._synthetic = {k: v for k, v in self._synthetic.items() if k[1] != n_rows}
+        path = os.path.join(self.tmpdir, f'student_{n_rows}.csv')
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def load_pickle(path):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        raise SkipBenchmark(f'未找到模型文件：{path}')
+
+
+def load_packed(path):
+    """把 pkl 中的森林在内存中展平（不依赖磁盘上的 .npz 导出文件）"""
+    return PackedForest(pack_forest(load_pickle(path)))
+
+
+def single_calls(records, call):
+    """逐条调用 SINGLE_CALLS 次（模拟表单每次提交预测一条）"""
+    def run():
+        for record in records[:SINGLE_CALLS]:
+            call(record)
+    return run
+
+
+# ---------------------- 企鹅分类器 ----------------------
+@benchmark('penguin.load_model', scaled=False)
+def _penguin_load_model(fixtures, n_rows):
+    with open(PENGUIN_MODEL_PATH, 'rb') as f:
+        raw = f.read()
+    pickle.loads(raw)  # 先反序列化一次，把 scikit-learn 的导入开销排除在计时之外
+    return lambda: pickle.loads(raw)
+
+
+@benchmark('penguin.encode_frame')
+def _penguin_encode(fixtures, n_rows):
+    encoder = encoder_for(load_pickle(PENGUIN_MODEL_PATH), PENGUIN_CATEGORICAL)
+    df = fixtures.synthetic('penguin', n_rows)
+    return lambda: encoder.encode_frame(df)
+
+
+@benchmark('penguin.predict_single', scaled=False)
+def _penguin_predict_single(fixtures, n_rows):
+    model = load_pickle(PENGUIN_MODEL_PATH)
+    encoder = encoder_for(model, PENGUIN_CATEGORICAL)
+    records = fixtures.synthetic('penguin', SINGLE_CALLS).to_dict('records')
+    return single_calls(records, lambda record: model.predict(encoder.encode_record(record)))
+
+
+@benchmark('penguin.predict_batch')
+def _penguin_predict_batch(fixtures, n_rows):
+    model = load_pickle(PENGUIN_MODEL_PATH)
+    X = encoder_for(model, PENGUIN_CATEGORICAL).encode_frame(fixtures.synthetic('penguin', n_rows))
+    return lambda: model.predict_proba(X)
+
+
+@benchmark('penguin.load_packed', scaled=False)
+def _penguin_load_packed(fixtures, n_rows):
+    buffer = io.BytesIO()
+    np.savez(buffer, **pack_forest(load_pickle(PENGUIN_MODEL_PATH)))
+    raw = buffer.getvalue()
+    return lambda: load_packed_bytes(raw)
+
+
+@benchmark('penguin.predict_single_packed', scaled=False)
+def _penguin_predict_single_packed(fixtures, n_rows):
+    model = load_packed(PENGUIN_MODEL_PATH)
+    encoder = encoder_for(model, PENGUIN_CATEGORICAL)
+    records = fixtures.synthetic('penguin', SINGLE_CALLS).to_dict('records')
+    return single_calls(records, lambda record: model.predict(encoder.encode_record(record)))
+
+
+@benchmark('penguin.predict_batch_packed')
+def _penguin_predict_batch_packed(fixtures, n_rows):
+    model = load_packed(PENGUIN_MODEL_PATH)
+    X = encoder_for(model, PENGUIN_CATEGORICAL).encode_frame(fixtures.synthetic('penguin', n_rows))
+    return lambda: model.predict_proba(X)
+
+
+# ---------------------- 医疗费用预测 ----------------------
+@benchmark('insurance.encode_frame')
+def _insurance_encode(fixtures, n_rows):
+    encoder = encoder_for(load_pickle(INSURANCE_MODEL_PATH), INSURANCE_CATEGORICAL)
+    df = fixtures.synthetic('insurance', n_rows)
+    return lambda: encoder.encode_frame(df)
+
+
+@benchmark('insurance.predict_single', scaled=False)
+def _insurance_predict_single(fixtures, n_rows):
+    model = load_pickle(INSURANCE_MODEL_PATH)
+    encoder = encoder_for(model, INSURANCE_CATEGORICAL)
+    records = fixtures.synthetic('insurance', SINGLE_CALLS).to_dict('records')
+    return single_calls(records, lambda record: predict_with_quantiles(model, encoder.encode_record(record)))
+
+
+@benchmark('insurance.predict_batch')
+def _insurance_predict_batch(fixtures, n_rows):
+    model = load_pickle(INSURANCE_MODEL_PATH)
+    X = encoder_for(model, INSURANCE_CATEGORICAL).encode_frame(fixtures.synthetic('insurance', n_rows))
+    return lambda: predict_with_quantiles(model, X)
+
+
+@benchmark('insurance.predict_single_packed', scaled=False)
+def _insurance_predict_single_packed(fixtures, n_rows):
+    model = load_packed(INSURANCE_MODEL_PATH)
+    encoder = encoder_for(model, INSURANCE_CATEGORICAL)
+    records = fixtures.synthetic('insurance', SINGLE_CALLS).to_dict('records')
+    return single_calls(records, lambda record: predict_with_quantiles(model, encoder.encode_record(record)))
+
+
+@benchmark('insurance.predict_batch_packed')
+def _insurance_predict_batch_packed(fixtures, n_rows):
+    model = load_packed(INSURANCE_MODEL_PATH)
+    X = encoder_for(model, INSURANCE_CATEGORICAL).encode_frame(fixtures.synthetic('insurance', n_rows))
+    return lambda: predict_with_quantiles(model, X)
+
+
+# ---------------------- 学生成绩系统 ----------------------
+@benchmark('student.parse_csv')
+def _student_parse(fixtures, n_rows):
+    path = fixtures.student_csv(n_rows)
+    return lambda: parse_csv(path)
+
+
+@benchmark('student.major_stats')
+def _student_major_stats(fixtures, n_rows):
+    df = fixtures.synthetic('student', n_rows)
+    return lambda: build_major_stats(df).table()
+
+
+@benchmark('student.predict_batch')
+def _student_predict_batch(fixtures, n_rows):
+    model = fit_model(fixtures.source('student'), 'benchmark')
+    df = fixtures.synthetic('student', n_rows)
+    return lambda: model.predict_frame(df)
+
+
+# ---------------------- 超市销售仪表板 ----------------------
+@benchmark('sales.build_indexes')
+def _sales_build(fixtures, n_rows):
+    df = fixtures.synthetic('sales', n_rows)
+    return lambda: (BitmapIndex(df, FILTER_DIMENSIONS), build_cube(df))
+
+
+@benchmark('sales.filter_aggregate')
+def _sales_filter_aggregate(fixtures, n_rows):
+    df = fixtures.synthetic('sales', n_rows)
+    index, cube = BitmapIndex(df, FILTER_DIMENSIONS), build_cube(df)
+    selections = {dim: df[dim].unique().tolist()[:2] for dim in FILTER_DIMENSIONS}
+
+    def run():
+        filtered = df.take(index.select(selections))
+        cube_slice = cube.slice(selections)
+        return filtered, cube_slice.total_sales, cube_slice.sales_by_hour(), cube_slice.sales_by_product()
+    return run
+
+
+def time_call(func, repeats=REPEATS):
+    """计时：先运行一次，耗时较短时再重复运行，返回每次的耗时（秒）"""
+    timings = []
+    gc.collect()
+    while True:
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+        if len(timings) >= repeats or sum(timings) >= MIN_REPEAT_SECONDS * repeats or timings[0] >= MIN_REPEAT_SECONDS:
+            return timings
+
+
+def run_one(fixtures, name, n_rows, setup, repeats):
+    result = {'name': name, 'rows': n_rows}
+    try:
+        timings = time_call(setup(fixtures, n_rows), repeats)
+    except SkipBenchmark as e:
+        result['skipped'] = str(e)
+    else:
+        result.update({
+            'repeats': len(timings), 'min_seconds': min(timings),
+            'median_seconds': statistics.median(timings),
+        })
+        if n_rows:
+            result['rows_per_second'] = n_rows / result['median_seconds']
+        if name.endswith('_single'):
+            result['per_call_seconds'] = result['median_seconds'] / SINGLE_CALLS
+    print(format_result(result), file=sys.stderr)
+    return result
+
+
+def run_benchmarks(scales=SCALES, selected=None, repeats=REPEATS, seed=0):
+    """运行（可按名称前缀筛选的）基准，返回结果列表；与规模无关的基准只运行一次"""
+    fixtures = Fixtures(seed)
+    chosen = [(name, scaled, setup) for name, scaled, setup in BENCHMARKS
+              if not selected or any(name.startswith(prefix) for prefix in selected)]
+    results = [run_one(fixtures, name, None, setup, repeats) for name, scaled, setup in chosen if not scaled]
+    try:
+        for n_rows in scales:
+            results += [run_one(fixtures, name, n_rows, setup, repeats) for name, scaled, setup in chosen if scaled]
+            fixtures.release(n_rows)
+    finally:
+        shutil.rmtree(fixtures.tmpdir, ignore_errors=True)
+    return results
+
+
+def format_result(result):
+    label = f"{result['name']}[{result['rows'] or '-'}]"
+    if 'skipped' in result:
+        return f'{label:<40} 跳过：{result["skipped"]}'
+    return f"{label:<40} 中位数 {result['median_seconds'] * 1000:10.2f} ms（{result['repeats']} 次）"
+
+
+def environment():
+    import sklearn
+    return {
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'numpy': np.__version__, 'pandas': pd.__version__, 'sklearn': sklearn.__version__,
+        'cpu_count': os.cpu_count(), 'agg_workers': default_workers(), 'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def find_regressions(results, baseline, max_slowdown=MAX_SLOWDOWN):
+    """与基线结果比较，返回中位数耗时超过基线 max_slowdown 倍的基准"""
+    previous = {(r['name'], r['rows']): r for r in baseline['results'] if 'median_seconds' in r}
+    regressions = []
+    for result in results:
+        before = previous.get((result['name'], result['rows']))
+        if before is None or 'median_seconds' not in result:
+            continue
+        ratio = result['median_seconds'] / before['median_seconds']
+        if ratio > max_slowdown:
+            regressions.append({'name': result['name'], 'rows': result['rows'], 'slowdown': round(ratio, 2),
+                                'baseline_seconds': before['median_seconds'],
+                                'median_seconds': result['median_seconds']})
+    return regressions
+
+
+def parse_scales(text):
+    """解析规模列表，例如 '1k,100k,10m'"""
+    units = {'k': 1_000, 'm': 1_000_000}
+    scales = []
+    for item in text.lower().split(','):
+        item = item.strip()
+        scales.append(int(float(item[:-1]) * units[item[-1]]) if item[-1] in units else int(item))
+    return scales
+
+
+def main(argv=None):
+    """命令行入口：python benchmark.py --scales 1k,100k,10m -o benchmark_results.json --baseline 基线.json"""
+    parser = argparse.ArgumentParser(description='模型加载、特征编码、预测与聚合热点路径的性能基准')
+    parser.add_argument('--scales', default=','.join(str(n) for n in SCALES), help='合成数据规模，例如 1k,100k,10m')
+    parser.add_argument('--only', nargs='*', help='只运行名称以这些前缀开头的基准，例如 penguin student.parse')
+    parser.add_argument('--repeats', type=int, default=REPEATS, help='耗时较短的基准重复运行的次数')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据的随机种子')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help='结果JSON路径')
+    parser.add_argument('--baseline', help='基线结果JSON，给出后检查性能回退，有回退时以退出码 1 结束')
+    parser.add_argument('--max-slowdown', type=float, default=MAX_SLOWDOWN, help='允许的最大变慢倍数')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(parse_scales(args.scales), args.only, args.repeats, args.seed)
+    report = {'environment': environment(), 'max_slowdown': args.max_slowdown, 'results': results}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report['regressions'] = find_regressions(results, json.load(f), args.max_slowdown)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    for regression in report.get('regressions', []):
+        print(f"性能回退：{regression['name']}[{regression['rows']}] 变慢 {regression['slowdown']} 倍", file=sys.stderr)
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# 位图索引筛选：为每个可筛选列的每个取值预先计算一个按64位机器字打包的位图，筛选时只做按位运算
+import numpy as np
+import pandas as pd
+
+from frame_cache import derived_for
+
+WORD_BITS = 64
+
+
+def pack_mask(mask):
+    """把布尔掩码打包为 uint64 数组：第 j 个字的第 i 位对应第 64*j+i 行"""
+    padded = np.zeros(-(-len(mask) // WORD_BITS) * WORD_BITS, dtype=bool)
+    padded[:len(mask)] = mask
+    return np.packbits(padded, bitorder="little").view("<u8")
+
+
+def unpack_indices(words, n_rows):
+    """把打包的位图还原为被选中行的位置数组（升序）"""
+    bits = np.unpackbits(words.view(np.uint8), bitorder="little", count=n_rows)
+    return np.flatnonzero(bits)
+
+
+class BitmapIndex:
+    """分类列的位图索引：同一列内选中的取值做 OR，不同列之间做 AND"""
+
+    def __init__(self, df, columns):
+        self.n_rows = len(df)
+        self.n_words = -(-self.n_rows // WORD_BITS)
+        self.all_rows = pack_mask(np.ones(self.n_rows, dtype=bool))  # 不做任何筛选时的位图（补齐位为0）
+        self.bitmaps = {}  # 列名 -> {取值: uint64 位图}
+        for col in columns:
+            values = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype("category")
+            codes = values.cat.codes.to_numpy()
+            self.bitmaps[col] = {
+                category: pack_mask(codes == code)
+                for code, category in enumerate(values.cat.categories)
+            }
+
+    def select_words(self, selections):
+        """返回满足筛选条件的位图；selections 为 列名 -> 选中取值列表，未出现的列不做限制"""
+        result = self.all_rows.copy()
+        for col, selected in selections.items():
+            column_words = np.zeros(self.n_words, dtype="<u8")
+            for value in selected:
+                bitmap = self.bitmaps[col].get(value)
+                if bitmap is not None:
+                    np.bitwise_or(column_words, bitmap, out=column_words)
+            np.bitwise_and(result, column_words, out=result)
+        return result
+
+    def select(self, selections):
+        """返回满足筛选条件的行位置数组，可直接用于 DataFrame.take"""
+        return unpack_indices(self.select_words(selections), self.n_rows)
+
+    def count(self, selections):
+        """满足筛选条件的行数（无需还原行位置）"""
+        return int(np.bitwise_count(self.select_words(selections)).sum())
+
+
+def bitmap_index_for(df, columns):
+    """获取（必要时构建）数据对应的位图索引，同一个 DataFrame 对象只构建一次"""
+    columns = tuple(columns)
+    return derived_for(df, ("bitmap_index", columns), lambda frame: BitmapIndex(frame, columns))
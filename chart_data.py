@@ -0,0 +1,100 @@
+# 图表数据层：在服务端用 NumPy 预先算好直方图分箱和箱线图统计量，只把汇总结果交给 Plotly，传给浏览器的数据量与样本数无关
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from frame_cache import derived_for
+from lazy_imports import lazy_module
+
+go = lazy_module("plotly.graph_objects")  # 只在画图时导入
+
+MAX_OUTLIERS = 50  # 箱线图最多展示的离群点个数（超过时等间隔抽取，始终保留最大/最小值）
+
+
+@dataclass
+class BoxSummary:
+    """箱线图统计量：四分位数按线性插值计算，须线为 1.5 倍四分位距内最远的数据点（与 Plotly 默认一致）"""
+    q1: float
+    median: float
+    q3: float
+    lowerfence: float
+    upperfence: float
+    mean: float
+    outliers: np.ndarray
+    n_outliers: int  # 离群点总数（outliers 可能只是抽样）
+
+
+def box_summary(values, max_outliers=MAX_OUTLIERS):
+    """计算一组数值的箱线图统计量"""
+    values = np.sort(np.asarray(values, dtype=np.float64))
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    n_outliers = len(outliers)
+    if n_outliers > max_outliers:
+        outliers = outliers[np.linspace(0, n_outliers - 1, max_outliers).round().astype(int)]
+    return BoxSummary(q1, median, q3, inside[0], inside[-1], values.mean(), outliers, n_outliers)
+
+
+def box_summary_from_sketch(sketch, mean):
+    """由 KLL 分位数草图近似计算箱线图统计量（流式统计时没有原始数据可用）
+
+    四分位数取草图的估计值；须线为 1.5 倍四分位距并限制在精确的最小/最大值以内，
+    离群点个数按草图估计的排名换算，只展示超出须线的最小/最大值两个点。
+    """
+    q1, median, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    lower = max(q1 - 1.5 * iqr, sketch.min)
+    upper = min(q3 + 1.5 * iqr, sketch.max)
+    below = sketch.rank(lower) if lower > sketch.min else 0.0
+    above = 1 - sketch.rank(upper) if upper < sketch.max else 0.0
+    outliers = np.array([value for value, beyond in ((sketch.min, below), (sketch.max, above)) if beyond])
+    return BoxSummary(q1, median, q3, lower, upper, mean, outliers, int(round((below + above) * sketch.n)))
+
+
+def box_summaries(df, group_col, value_col):
+    """按分组一次性计算所有组的箱线图统计量：先按 (组, 值) 排序，再对每组的连续片段求分位数"""
+    groups = pd.Categorical(df[group_col])
+    codes = groups.codes
+    values = df[value_col].to_numpy(dtype=np.float64)
+    order = np.lexsort((values, codes))
+    sorted_codes, sorted_values = codes[order], values[order]
+    bounds = np.searchsorted(sorted_codes, np.arange(len(groups.categories) + 1))
+    return {
+        group: box_summary(sorted_values[bounds[i]:bounds[i + 1]])
+        for i, group in enumerate(groups.categories) if bounds[i + 1] > bounds[i]
+    }
+
+
+def box_summaries_for(df, group_col, value_col):
+    """获取（必要时计算）数据对应的分组箱线图统计量，同一个 DataFrame 对象只计算一次"""
+    return derived_for(df, ("box_summaries", group_col, value_col),
+                       lambda frame: box_summaries(frame, group_col, value_col))
+
+
+def histogram_figure(counts, edges, color, title, x_title):
+    """用预先统计好的分箱计数画直方图"""
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+        marker_color=color, name=x_title
+    ))
+    fig.update_layout(template="plotly_white", title=title, xaxis_title=x_title, yaxis_title="count", bargap=0)
+    return fig
+
+
+def box_figure(summary, color, title, y_title):
+    """用预先算好的统计量画箱线图，离群点单独作为散点叠加"""
+    fig = go.Figure(go.Box(
+        q1=[summary.q1], median=[summary.median], q3=[summary.q3],
+        lowerfence=[summary.lowerfence], upperfence=[summary.upperfence], mean=[summary.mean],
+        x=[y_title], marker_color=color, name=y_title, boxpoints=False
+    ))
+    if len(summary.outliers):
+        fig.add_trace(go.Scatter(
+            x=[y_title] * len(summary.outliers), y=summary.outliers, mode="markers",
+            marker=dict(color=color, size=5), name=f"离群点（共 {summary.n_outliers} 个）"
+        ))
+    fig.update_layout(template="plotly_white", title=title, yaxis_title=y_title, showlegend=False)
+    return fig
@@ -0,0 +1,104 @@
+# 特征编码：根据模型的 feature_names_in_ 预先编译 one-hot 索引表，单条记录与整表数据共用同一套编码逻辑
+import warnings
+import weakref
+
+import numpy as np
+
+from lazy_imports import lazy_module
+
+# pandas 只在整表编码时使用，单条记录编码（表单预测）无需导入
+pd = lazy_module('pandas')
+
+# 编码结果是不带列名的 NumPy 数组，按训练时的列顺序排列，可以放心忽略 scikit-learn 的列名提示。
+# 导入时安装一次、只匹配 scikit-learn 发出的这一条提示：warnings.catch_warnings() 会整体保存并恢复全局过滤器列表，
+# 在 Streamlit 脚本线程、预测服务线程池和预热线程中并发进出时会互相覆盖，不能用来限定范围
+warnings.filterwarnings('ignore', message='X does not have valid feature names', category=UserWarning, module='sklearn')
+
+
+class MissingColumnsError(ValueError):
+    """CSV缺少系统所需的列"""
+
+    def __init__(self, missing):
+        super().__init__(f"CSV缺少必要列：{missing}")
+        self.missing = missing
+
+
+class FeatureEncoder:
+    """把原始记录（列名 -> 取值）编码为模型输入的连续 float64 数组
+
+    feature_names 通常取自模型的 feature_names_in_（训练时由 pd.get_dummies 生成），
+    categorical 中列出的原始列会按“原列名_取值”的特征名做 one-hot 编码，其余特征按数值列处理。
+    """
+
+    def __init__(self, feature_names, categorical):
+        self.feature_names = [str(name) for name in feature_names]
+        self.numeric = []       # [(特征列下标, 原始列名)]
+        self.categories = {}    # 原始列名 -> {取值: 特征列下标}
+        for idx, name in enumerate(self.feature_names):
+            column, sep, value = name.partition('_')
+            if sep and column in categorical:
+                self.categories.setdefault(column, {})[value] = idx
+            else:
+                self.numeric.append((idx, name))
+        # 整表编码时使用的查找表：分类取值的编码 -> 特征列下标
+        self._category_values = {col: list(table) for col, table in self.categories.items()}
+        self._category_index = {col: np.fromiter(table.values(), dtype=np.intp)
+                                for col, table in self.categories.items()}
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    @property
+    def required_columns(self):
+        """编码所需的原始列：数值列 + 分类列"""
+        return [column for _, column in self.numeric] + list(self.categories)
+
+    def check_columns(self, columns):
+        """检查表头是否包含全部所需的原始列，缺列时抛出 MissingColumnsError"""
+        missing = [column for column in self.required_columns if column not in columns]
+        if missing:
+            raise MissingColumnsError(missing)
+
+    def encode_record(self, record):
+        """编码单条记录（dict），返回形状为 (1, 特征数) 的数组；未见过的分类取值编码为全0"""
+        row = np.zeros((1, self.n_features), dtype=np.float64)
+        for idx, column in self.numeric:
+            row[0, idx] = record[column]
+        for column, table in self.categories.items():
+            idx = table.get(record[column])
+            if idx is not None:
+                row[0, idx] = 1.0
+        return row
+
+    def encode_frame(self, df):
+        """一次性编码整张表（DataFrame 或 列名 -> 数组 的映射），返回形状为 (行数, 特征数) 的数组
+
+        数值列无法转换的值记为 NaN；分类列缺失或未见过的取值编码为全0，与 pd.get_dummies 一致。
+        """
+        n_rows = len(df) if isinstance(df, pd.DataFrame) else len(next(iter(df.values())))
+        out = np.zeros((n_rows, self.n_features), dtype=np.float64)
+        for idx, column in self.numeric:
+            values = df[column]
+            if getattr(values, 'dtype', None) == object:
+                values = pd.to_numeric(values, errors='coerce')
+            out[:, idx] = np.asarray(values, dtype=np.float64)
+        for column, values in self._category_values.items():
+            codes = pd.Categorical(df[column], categories=values).codes
+            rows = np.flatnonzero(codes >= 0)
+            out[rows, self._category_index[column][codes[rows]]] = 1.0
+        return out
+
+
+# 每个模型对象只编译一次编码器；模型被注册表热更新替换后，旧编码器随旧模型一起释放
+_ENCODERS = weakref.WeakKeyDictionary()
+
+
+def encoder_for(model, categorical):
+    """获取（必要时编译）与模型 feature_names_in_ 匹配的编码器"""
+    categorical = tuple(categorical)
+    cached = _ENCODERS.setdefault(model, {})
+    encoder = cached.get(categorical)
+    if encoder is None:
+        encoder = cached[categorical] = FeatureEncoder(model.feature_names_in_, categorical)
+    return encoder
@@ -0,0 +1,47 @@
+# 随机森林分位数预测：一次取得所有树的叶子节点，查表得到逐树预测值，再沿树的维度求分位数
+import weakref
+
+import numpy as np
+
+from packed_forest import PackedForest
+
+# 默认输出的分位数（p10 / p50 / p90）
+DEFAULT_PERCENTILES = (10, 50, 90)
+
+# 每个模型对象只构建一次叶子取值表；模型被注册表热更新替换后随旧模型一起释放
+_LEAF_VALUES = weakref.WeakKeyDictionary()
+
+
+def leaf_value_table(model):
+    """返回形状为 (树的数量, 最大节点数) 的取值表：table[i, node] 为第 i 棵树该节点的预测值"""
+    table = _LEAF_VALUES.get(model)
+    if table is None:
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        table = np.zeros((len(trees), max(tree.node_count for tree in trees)), dtype=np.float64)
+        for idx, tree in enumerate(trees):
+            table[idx, :tree.node_count] = tree.value[:, 0, 0]
+        _LEAF_VALUES[model] = table
+    return table
+
+
+def per_tree_predictions(model, X):
+    """返回形状为 (样本数, 树的数量) 的逐树预测值
+
+    model.apply 一次性给出每个样本在每棵树中落入的叶子编号，再用花式索引查表，
+    不需要在 Python 循环中逐棵树调用 predict。
+    """
+    if isinstance(model, PackedForest):
+        return model.per_tree_predictions(X)
+    leaves = model.apply(X)
+    table = leaf_value_table(model)
+    return table[np.arange(table.shape[0]), leaves]
+
+
+def predict_with_quantiles(model, X, percentiles=DEFAULT_PERCENTILES):
+    """返回 (平均预测值, 分位数预测值)
+
+    平均预测值与 model.predict 的结果一致，形状为 (样本数,)；
+    分位数预测值形状为 (样本数, 分位数个数)，按 percentiles 的顺序排列。
+    """
+    predictions = per_tree_predictions(model, X)
+    return predictions.mean(axis=1), np.percentile(predictions, percentiles, axis=1).T
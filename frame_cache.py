@@ -0,0 +1,56 @@
+# 派生结构缓存：把立方体、位图索引、统计表等依附在某个 DataFrame 对象上，同一对象只构建一次
+import threading
+import weakref
+
+_lock = threading.RLock()
+_derived = {}  # (id(DataFrame), 名称) -> (DataFrame 弱引用, 派生对象)
+
+
+def _get(df, key):
+    entry = _derived.get(key)
+    if entry is not None and entry[0]() is df:
+        return entry
+    return None
+
+
+def set_derived(df, name, value):
+    """直接登记 DataFrame 的派生结构（例如增量更新后已经算好的统计结果）"""
+    key = (id(df), name)
+    with _lock:
+        _derived[key] = (weakref.ref(df, lambda _: _derived.pop(key, None)), value)
+    return value
+
+
+def derived_for(df, name, builder):
+    """获取（必要时构建）依附于某个 DataFrame 的派生结构
+
+    同一个 DataFrame 对象只构建一次；数据重新加载后旧对象被释放，对应的派生结构随之清除。
+    """
+    key = (id(df), name)
+    entry = _get(df, key)
+    if entry is not None:
+        return entry[1]
+    with _lock:
+        entry = _get(df, key)
+        if entry is not None:
+            return entry[1]
+        return set_derived(df, name, builder(df))
+
+
+_incremental = {}  # 名称 -> 增量更新函数 (旧派生对象, 新增数据) -> 新派生对象
+
+
+def register_incremental(name, updater):
+    """登记某个派生结构的增量更新方式，数据追加时可由旧结果和新增部分直接得到新结果"""
+    _incremental[name] = updater
+
+
+def carry_derived(old_df, new_df, delta):
+    """数据追加后，把旧 DataFrame 上已构建且支持增量更新的派生结构迁移到新 DataFrame 上
+
+    没有登记增量更新方式的派生结构不迁移，之后按需重新构建。
+    """
+    for name, updater in list(_incremental.items()):
+        entry = _get(old_df, (id(old_df), name))
+        if entry is not None:
+            set_derived(new_df, name, updater(entry[1], delta))
@@ -0,0 +1,97 @@
+# 图片资源缓存：按页面上的显示宽度预先缩放并重新压缩编码，压缩后的字节常驻内存，所有会话共享
+import io
+import os
+import threading
+from dataclasses import dataclass
+
+from PIL import Image
+
+from model_registry import file_signature
+
+JPEG_QUALITY = 80
+PNG_COLORS = 256   # 带透明通道的图片量化为调色板 PNG
+FULL_WIDTH = 800  # 按容器宽度显示的大图统一缩放到的宽度
+
+
+@dataclass
+class ImageAsset:
+    """一张按显示宽度处理好的图片"""
+    path: str
+    width: int
+    signature: tuple   # 源文件的 (修改时间, 大小)
+    data: bytes        # 重新编码后的图片字节
+    source_bytes: int  # 源文件大小
+
+
+def _has_alpha(img):
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def render_image(path, width):
+    """读取图片，按宽度等比缩小（不放大）后重新编码，返回编码后的字节
+
+    不透明图片编码为 JPEG，带透明通道的编码为调色板 PNG。st.image 对 JPEG/PNG 字节
+    （且宽度不超过显示宽度）会原样发送，其他格式（如 WebP）每次都会被解码再重新编码。
+    """
+    with Image.open(path) as img:
+        img.load()
+        alpha = _has_alpha(img)
+        img = img.convert("RGBA" if alpha else "RGB")
+        if img.width > width:
+            img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if alpha:
+            img.quantize(PNG_COLORS, method=Image.Quantize.FASTOCTREE).save(buffer, format="PNG", optimize=True)
+        else:
+            img.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+class AssetCache:
+    """进程级图片缓存：(路径, 宽度) -> ImageAsset，源文件修改后自动重新生成
+
+    同一张图片每次返回同一份字节，Streamlit 按内容生成的媒体地址保持不变，浏览器可以直接复用缓存。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._assets = {}
+
+    def get(self, path, width):
+        """返回缩放编码后的图片字节；文件不存在时抛出 FileNotFoundError"""
+        key = (os.path.abspath(path), width)
+        signature = file_signature(path)
+        asset = self._assets.get(key)
+        if asset is not None and asset.signature == signature:
+            return asset.data
+        with self._lock:
+            asset = self._assets.get(key)
+            if asset is None or asset.signature != signature:
+                asset = ImageAsset(path, width, signature, render_image(path, width), signature[1])
+                self._assets[key] = asset
+        return asset.data
+
+    def preload(self, items):
+        """启动时预先生成一批图片（[(路径, 宽度), ...]），缺失的文件跳过"""
+        for path, width in items:
+            try:
+                self.get(path, width)
+            except FileNotFoundError:
+                continue
+
+    @property
+    def assets(self):
+        return list(self._assets.values())
+
+
+ASSETS = AssetCache()
+
+
+def image_bytes(path, width=FULL_WIDTH):
+    """从进程级缓存中获取按显示宽度处理好的图片字节"""
+    return ASSETS.get(path, width)
+
+
+def preload_images(items):
+    """启动时预先生成页面会用到的图片"""
+    ASSETS.preload(items)
@@ -0,0 +1,222 @@
+# 重跑性能分析（按需开启）：记录每次重跑中各阶段的耗时和内存峰值，显示在侧边栏调试面板并写入结构化日志
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+
+import streamlit as st
+
+PROFILE_ENV = "APP_PROFILE"     # 环境变量设为 1 时所有会话都开启
+PROFILE_QUERY_PARAM = "profile"  # 或在页面地址后加 ?profile=1 只对当前会话开启
+
+logger = logging.getLogger("instrumentation")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_local = threading.local()  # 每次重跑在自己的脚本线程中执行，当前的分析器按线程保存
+
+# tracemalloc 是进程级的：由本模块开启时，等所有正在分析的重跑都结束后再关闭；
+# 未执行到 finish_rerun 就结束的重跑（异常等）在下一次重跑开始时补记日志并释放
+_tracing_lock = threading.Lock()
+_tracing_owner = False
+_active = set()
+
+
+@dataclass
+class Span:
+    """一个计时阶段"""
+    name: str
+    depth: int
+    start: float
+    start_memory: int
+    seconds: float = 0.0
+    peak: int = 0  # 阶段内 tracemalloc 记录的内存峰值
+
+
+def profiling_enabled():
+    """是否开启性能分析：环境变量 APP_PROFILE=1，或页面地址带 ?profile=1"""
+    if os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes"):
+        return True
+    try:
+        return st.query_params.get(PROFILE_QUERY_PARAM) == "1"
+    except Exception:
+        return False
+
+
+class RerunProfiler:
+    """一次重跑的性能记录
+
+    mark() 结束上一个顶层阶段并开始新的阶段，适合按脚本中的分段注释依次标记；
+    section() 是嵌套在当前阶段内的上下文管理器，用于模型加载、预测等较小的片段。
+    内存通过 tracemalloc 统计（进程级，同时有多个会话重跑时数值会相互叠加）。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.spans = []
+        self._stack = []
+        self.thread = threading.current_thread()
+        _acquire_tracing(self)
+        tracemalloc.reset_peak()
+        self.start = self._last = time.perf_counter()
+        self.end = None
+        self.done = False  # 已 finish 或 abandon（由 _tracing_lock 保护）
+
+    def _fold_peak(self):
+        """把当前峰值计入所有未结束的阶段，再重置峰值，使每个阶段的峰值互不干扰"""
+        peak = tracemalloc.get_traced_memory()[1]
+        for span in self._stack:
+            span.peak = max(span.peak, peak)
+        tracemalloc.reset_peak()
+
+    def _open(self, name):
+        self._fold_peak()
+        span = Span(name, len(self._stack), time.perf_counter(), tracemalloc.get_traced_memory()[0])
+        self.spans.append(span)
+        self._stack.append(span)
+        self._last = span.start
+
+    def _close(self):
+        self._fold_peak()
+        span = self._stack.pop()
+        self._last = time.perf_counter()
+        span.seconds = self._last - span.start
+
+    def mark(self, name):
+        while self._stack:
+            self._close()
+        self._open(name)
+
+    @contextmanager
+    def section(self, name):
+        self._open(name)
+        try:
+            yield
+        finally:
+            self._close()
+
+    def report(self):
+        return {
+            "app": self.app,
+            "rerun_seconds": round((self.end or time.perf_counter()) - self.start, 6),
+            "sections": [
+                {"name": span.name, "depth": span.depth, "seconds": round(span.seconds, 6),
+                 "peak_kb": round(max(span.peak - span.start_memory, 0) / 1024, 1)}
+                for span in self.spans
+            ],
+        }
+
+    def finish(self):
+        """结束本次重跑：写入日志并在侧边栏显示各阶段耗时"""
+        with _tracing_lock:
+            self.done = True
+        while self._stack:
+            self._close()
+        report = self.report()
+        _release_tracing(self)
+        logger.info(json.dumps(report, ensure_ascii=False))
+        with st.sidebar.expander("⏱️ 性能分析", expanded=True):
+            st.caption(f"本次重跑共 {report['rerun_seconds'] * 1000:.1f} 毫秒")
+            st.dataframe(
+                [{"阶段": "　" * section["depth"] + section["name"],
+                  "耗时（毫秒）": round(section["seconds"] * 1000, 1),
+                  "内存峰值增量（KB）": section["peak_kb"]}
+                 for section in report["sections"]],
+                hide_index=True,
+            )
+        return report
+
+    def abandon(self):
+        """重跑提前结束（异常或直接调用 st.stop）时使用：各阶段截止到最后一次记录的时间，只写日志并释放 tracemalloc"""
+        for span in self._stack:
+            span.seconds = self._last - span.start
+        self._stack.clear()
+        self.end = self._last
+        report = {**self.report(), "unfinished": True}
+        _release_tracing(self)
+        logger.info(json.dumps(report, ensure_ascii=False))
+
+
+def _acquire_tracing(profiler):
+    global _tracing_owner
+    with _tracing_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owner = True
+        _active.add(profiler)
+
+
+def _release_tracing(profiler):
+    global _tracing_owner
+    with _tracing_lock:
+        _active.discard(profiler)
+        if _tracing_owner and not _active:
+            tracemalloc.stop()
+            _tracing_owner = False
+
+
+class _DisabledProfiler:
+    """未开启性能分析时使用：所有操作都是空操作"""
+
+    def mark(self, name):
+        pass
+
+    def section(self, name):
+        return nullcontext()
+
+    def finish(self):
+        return None
+
+
+_DISABLED = _DisabledProfiler()
+
+
+def _abandon_stale():
+    """补记未执行到 finish_rerun 的重跑：所在脚本线程已结束，或同一线程已开始新的重跑"""
+    current_thread = threading.current_thread()
+    with _tracing_lock:
+        stale = [profiler for profiler in _active
+                 if not profiler.done and (profiler.thread is current_thread or not profiler.thread.is_alive())]
+        for profiler in stale:
+            profiler.done = True
+    for profiler in stale:
+        profiler.abandon()
+
+
+def start_rerun(app):
+    """在脚本开头调用：按需开启本次重跑的性能分析"""
+    _abandon_stale()
+    _local.profiler = RerunProfiler(app) if profiling_enabled() else _DISABLED
+    return _local.profiler
+
+
+def current():
+    return getattr(_local, "profiler", _DISABLED)
+
+
+def mark_section(name):
+    """开始一个新的顶层阶段（同时结束上一个阶段）"""
+    current().mark(name)
+
+
+def timed_section(name):
+    """在当前阶段内计时一个嵌套片段：with timed_section("预测"): ..."""
+    return current().section(name)
+
+
+def finish_rerun():
+    """在脚本末尾调用：输出本次重跑的性能记录"""
+    return current().finish()
+
+
+def stop_rerun():
+    """代替 st.stop()：先输出本次重跑的性能记录，再停止执行脚本"""
+    finish_rerun()
+    st.stop()
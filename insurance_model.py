@@ -0,0 +1,6 @@
+# 医疗费用预测模型的约定：模型文件与训练时做了 one-hot 编码的原始列（页面、预测服务、启动预热和基准测试共用）
+# 随机森林回归模型文件（存在与之一致的 rfr_model.npz 导出文件时优先加载导出文件，无需导入 scikit-learn）
+MODEL_PATH = 'rfr_model.pkl'
+
+# 训练时做了one-hot编码的原始列
+CATEGORICAL_COLUMNS = ('性别', '是否吸烟', '区域')
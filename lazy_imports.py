@@ -0,0 +1,93 @@
+# 延迟导入：重量级库（Plotly、pandas 等）在页面第一次用到时才真正导入，并提供各入口脚本的导入耗时报告
+import argparse
+import importlib
+import os
+import re
+import subprocess
+import sys
+import time
+import types
+
+ENTRY_POINTS = ["qier.py", "streamlit_predict_v2.py", "student.py", "supermarket_analysis.py"]
+# 报告中单独列出是否被导入的重量级库
+HEAVY_MODULES = ["numpy", "pandas", "pyarrow", "sklearn", "plotly.express", "plotly.graph_objects", "PIL.Image"]
+
+import_seconds = {}  # 模块名 -> 首次使用时实际导入的耗时（秒）
+
+
+class LazyModule(types.ModuleType):
+    """模块代理：第一次访问属性时才导入真正的模块，之后直接转发
+
+    不另加锁：并发的首次访问由导入系统自身的模块锁串行化（后到的线程拿到同一个模块对象），
+    避免与其他线程持有的模块导入锁互相等待，嵌套的延迟导入也不会自锁。
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self.__name__)
+            # 并发的首次访问等待的是同一次导入，只保留最先记录的耗时
+            import_seconds.setdefault(self.__name__, time.perf_counter() - start)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_module(name):
+    """返回模块的延迟导入代理；模块已经导入过时直接返回模块本身"""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+# ---------------------- 导入耗时报告 ----------------------
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_entry_point(script):
+    """以裸模式运行入口脚本的默认页面（python -X importtime），返回 (顶层导入总耗时秒, [(模块, 累计秒)], 已导入的模块集合)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", script],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(script)) or ".",
+    )
+    top_level = []
+    imported = set()
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(2)), len(match.group(3)), match.group(4)
+        imported.add(module)
+        if indent == 1:  # 只有一个前导空格的是顶层导入
+            top_level.append((module, cumulative / 1e6))
+    top_level.sort(key=lambda item: item[1], reverse=True)
+    return sum(seconds for _, seconds in top_level), top_level, imported
+
+
+def main(argv=None):
+    """命令行入口：python lazy_imports.py [入口脚本 ...] --top 8"""
+    parser = argparse.ArgumentParser(description="各入口脚本默认页面的导入耗时报告")
+    parser.add_argument("scripts", nargs="*", default=ENTRY_POINTS, help="入口脚本，默认全部四个应用")
+    parser.add_argument("--top", type=int, default=8, help="列出耗时最多的前几个顶层导入")
+    args = parser.parse_args(argv)
+    for script in args.scripts:
+        total, top_level, imported = measure_entry_point(script)
+        print(f"{script}：顶层导入共 {total * 1000:.0f} 毫秒")
+        for module, seconds in top_level[:args.top]:
+            print(f"    {module:<32} {seconds * 1000:8.1f} 毫秒")
+        loaded = [name for name in HEAVY_MODULES if name in imported]
+        skipped = [name for name in HEAVY_MODULES if name not in imported]
+        print(f"    已导入：{', '.join(loaded) or '无'}；未导入：{', '.join(skipped) or '无'}")
+
+
+if __name__ == "__main__":
+    main()
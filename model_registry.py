@@ -0,0 +1,129 @@
+# 模型注册表：进程内所有会话共享的模型（pickle 等产物）加载缓存
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class ArtifactInfo:
+    """单个已加载产物的元信息（用于展示加载成本和判断是否需要热更新）"""
+    path: str            # 产物的绝对路径
+    mtime_ns: int        # 加载时文件的修改时间（纳秒）
+    size: int            # 加载时文件大小（字节）
+    sha256: str          # 文件内容哈希，可作为产物版本号
+    load_seconds: float  # 读取并反序列化耗时（秒）
+    memory_bytes: int    # 反序列化带来的常驻内存（RSS）增量，无法获取时为 None
+    loaded_at: float     # 加载完成的时间戳
+    hits: int = 0        # 命中缓存（未重新加载）的次数
+
+
+def file_signature(path):
+    """返回文件的 (修改时间, 大小)，作为判断文件是否变化的轻量签名"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ModelRegistry:
+    """按“文件路径 + 修改时间/内容哈希”缓存反序列化结果，文件变化时自动重新加载"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # 绝对路径 -> (ArtifactInfo, 对象)
+
+    def load(self, path, loader=None):
+        """获取产物对象：首次调用或文件在磁盘上被替换时才真正读取并反序列化
+
+        未指定 loader 时按文件后缀选择（.npz 为紧凑随机森林，.json 为 JSON，其余按 pickle 处理）。
+        """
+        abs_path = os.path.abspath(path)
+        loader = loader or loader_for(abs_path)
+        mtime_ns, size = file_signature(abs_path)
+        with self._lock:
+            entry = self._entries.get(abs_path)
+            if entry is not None:
+                info, obj = entry
+                if (info.mtime_ns, info.size) == (mtime_ns, size):
+                    info.hits += 1
+                    return obj
+
+            with open(abs_path, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            # 仅修改时间变化而内容未变（如 touch、重新检出），沿用已加载的对象
+            if entry is not None and entry[0].sha256 == digest:
+                info.mtime_ns, info.size = mtime_ns, size
+                info.hits += 1
+                return entry[1]
+
+            obj, load_seconds, memory_bytes = _timed_load(raw, loader)
+            self._entries[abs_path] = (
+                ArtifactInfo(abs_path, mtime_ns, size, digest, load_seconds, memory_bytes, time.time()),
+                obj,
+            )
+            return obj
+
+    def info(self, path):
+        """返回已加载产物的元信息，未加载过则返回 None"""
+        entry = self._entries.get(os.path.abspath(path))
+        return entry[0] if entry is not None else None
+
+    def infos(self):
+        """返回全部已加载产物的元信息列表"""
+        return [info for info, _ in list(self._entries.values())]
+
+    def evict(self, path=None):
+        """移除指定产物（不传路径则清空全部），下次访问时重新加载"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+
+def loader_for(path):
+    """按文件后缀选择反序列化函数"""
+    if path.endswith('.npz'):
+        from packed_forest import loads  # 只依赖 NumPy，不导入 scikit-learn
+        return loads
+    if path.endswith('.json'):
+        return json.loads
+    return pickle.loads
+
+
+def _rss_bytes():
+    """读取当前进程的常驻内存（RSS），仅在提供 /proc 的系统上可用，否则返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def _timed_load(raw, loader):
+    """执行反序列化，统计耗时和常驻内存增量（包含首次加载时导入依赖库的开销）"""
+    before = _rss_bytes()
+    start = time.perf_counter()
+    obj = loader(raw)
+    load_seconds = time.perf_counter() - start
+    after = _rss_bytes()
+    memory_bytes = max(after - before, 0) if before is not None and after is not None else None
+    return obj, load_seconds, memory_bytes
+
+
+# 进程级单例：同一 Python 进程中的所有 Streamlit 会话共用
+REGISTRY = ModelRegistry()
+
+
+def load_artifact(path, loader=None):
+    """从进程级注册表中获取产物对象"""
+    return REGISTRY.load(path, loader)
+
+
+def artifact_info(path):
+    """获取进程级注册表中产物的元信息"""
+    return REGISTRY.info(path)
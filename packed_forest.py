@@ -0,0 +1,247 @@
+# 紧凑随机森林：把训练好的 scikit-learn 森林展平为若干 NumPy 数组保存为 .npz，
+# 加载时无需导入 scikit-learn，预测时对一批样本同时沿所有树逐层下行（每层几次向量化索引）
+import argparse
+import hashlib
+import io
+import os
+import pickle
+import threading
+
+from lazy_imports import lazy_module
+from model_registry import file_signature
+
+np = lazy_module('numpy')  # 只判断导出文件是否可用时不必导入
+
+TOLERANCE = 1e-9  # 导出后校验：与 scikit-learn 输出的最大允许差异
+CHECK_ROWS = 2000  # 导出后校验用的随机样本数
+BLOCK_ROWS = 4096  # 每次同时下行的样本数：中间数组为 (块行数, 树的数量)，大批量预测时分块以控制内存
+
+# 默认导出的模型（存在时）
+MODEL_PATHS = ['rfc_model.pkl', 'rfr_model.pkl']
+
+
+class PackedForest:
+    """展平后的随机森林：所有树的节点首尾相接存放，roots 为各棵树根节点的全局编号
+
+    叶子节点的左右子节点都指向自身。分类器的节点取值为各类别的概率，回归器为预测值；
+    接口与 scikit-learn 的 predict / predict_proba / feature_names_in_ / classes_ 保持一致，可直接替换原模型。
+    """
+
+    def __init__(self, arrays):
+        self.kind = str(arrays['kind'])
+        self.feature_names_in_ = arrays['feature_names']
+        self.classes_ = arrays['classes'] if self.kind == 'classifier' else None
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.missing_left = arrays['missing_left']
+        self.value = arrays['value']
+        self.max_depth = int(arrays['max_depth'])
+        self.source_sha256 = str(arrays['source_sha256'])
+        # 预测时使用的派生数组（下标统一为 intp，避免每次索引时转换类型）
+        self._is_leaf = self.left == np.arange(len(self.left))
+        self._feature = self.feature.astype(np.intp)
+        self._children = np.stack([self.right, self.left], axis=1).ravel().astype(np.intp)  # children[2*节点 + 是否向左]
+        # 不大于阈值的最大 float32：float32 特征与它比较，结果与 scikit-learn 中和 float64 阈值比较完全相同
+        threshold32 = self.threshold.astype(np.float32)
+        self._threshold32 = np.where(threshold32 > self.threshold, np.nextafter(threshold32, np.float32(-np.inf)), threshold32)
+        self._has_missing_left = bool(self.missing_left.any())
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def n_features_in_(self):
+        return len(self.feature_names_in_)
+
+    def apply(self, X):
+        """返回形状为 (样本数, 树的数量) 的叶子节点全局编号
+
+        所有 (样本, 树) 组合展平后一起逐层下行，每层只处理尚未到达叶子的组合。
+        与 scikit-learn 一样先把特征转为 float32 再比较，保证落入同一个叶子；
+        缺失值按训练时记录的方向（missing_go_to_left）下行，未记录时走右子树。
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_trees = len(X), len(self.roots)
+        leaves = np.tile(self.roots.astype(np.intp), n_rows)
+        pending = np.flatnonzero(~self._is_leaf[leaves])
+        nodes = leaves[pending]
+        offsets = pending // n_trees * X.shape[1]  # 各组合所在样本在展平特征中的起点
+        flat = X.ravel()
+        while len(pending):
+            values = flat[offsets + self._feature[nodes]]
+            go_left = values <= self._threshold32[nodes]
+            if self._has_missing_left:
+                go_left |= np.isnan(values) & self.missing_left[nodes]
+            nodes = self._children[2 * nodes + go_left]
+            done = self._is_leaf[nodes]
+            leaves[pending[done]] = nodes[done]
+            keep = ~done
+            pending, nodes, offsets = pending[keep], nodes[keep], offsets[keep]
+        return leaves.reshape(n_rows, n_trees)
+
+    def _by_block(self, X, reduce):
+        """按 BLOCK_ROWS 行分块求叶子编号并归约，再拼接各块结果"""
+        X = np.asarray(X)
+        return np.concatenate([reduce(self.apply(X[start:start + BLOCK_ROWS]))
+                               for start in range(0, max(len(X), 1), BLOCK_ROWS)])
+
+    def per_tree_predictions(self, X):
+        """回归森林：返回形状为 (样本数, 树的数量) 的逐树预测值"""
+        return self._by_block(X, lambda leaves: self.value[leaves, 0])
+
+    def predict_proba(self, X):
+        """分类森林：各棵树叶子上的类别概率取平均"""
+        return self._by_block(X, lambda leaves: self.value[leaves].mean(axis=1))
+
+    def predict(self, X):
+        if self.kind == 'classifier':
+            return self.classes_[self.predict_proba(X).argmax(axis=1)]
+        return self._by_block(X, lambda leaves: self.value[leaves, 0].mean(axis=1))
+
+
+# ---------------------- 导出 ----------------------
+def pack_forest(model, source_sha256=''):
+    """把 scikit-learn 随机森林（分类或单输出回归）展平为数组字典"""
+    if model.n_outputs_ != 1:
+        raise ValueError('只支持单输出的随机森林')
+    classifier = hasattr(model, 'classes_')
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+    parts = {name: [] for name in ('feature', 'threshold', 'left', 'right', 'missing_left', 'value')}
+    for offset, tree in zip(offsets, trees):
+        nodes = np.arange(tree.node_count) + offset
+        leaf = tree.children_left < 0
+        parts['feature'].append(np.where(leaf, 0, tree.feature))
+        parts['threshold'].append(np.where(leaf, 0.0, tree.threshold))
+        parts['left'].append(np.where(leaf, nodes, tree.children_left + offset))
+        parts['right'].append(np.where(leaf, nodes, tree.children_right + offset))
+        missing_left = getattr(tree, 'missing_go_to_left', None)
+        parts['missing_left'].append(np.zeros(tree.node_count, dtype=bool) if missing_left is None else missing_left.astype(bool))
+        value = tree.value[:, 0, :].astype(np.float64)
+        if classifier:
+            # 与 DecisionTreeClassifier.predict_proba 一致：按行归一化为概率
+            total = value.sum(axis=1, keepdims=True)
+            value = value / np.where(total == 0, 1.0, total)
+        parts['value'].append(value)
+    index_dtype = np.int32 if offsets[-1] < 2 ** 31 else np.int64
+    return {
+        'kind': np.array('classifier' if classifier else 'regressor'),
+        'feature_names': np.asarray(model.feature_names_in_, dtype=str),
+        'classes': np.asarray(model.classes_ if classifier else []),
+        'roots': offsets[:-1].astype(index_dtype),
+        'feature': np.concatenate(parts['feature']).astype(index_dtype),
+        'threshold': np.concatenate(parts['threshold']),
+        'left': np.concatenate(parts['left']).astype(index_dtype),
+        'right': np.concatenate(parts['right']).astype(index_dtype),
+        'missing_left': np.concatenate(parts['missing_left']),
+        'value': np.concatenate(parts['value']),
+        'max_depth': np.array(max(tree.max_depth for tree in trees)),
+        'source_sha256': np.array(source_sha256),
+    }
+
+
+def check_rows(model, n_rows=CHECK_ROWS, seed=0):
+    """校验用的样本：各特征在训练阈值范围内均匀取值，并混入恰好等于阈值的值（检验边界的比较方向）"""
+    rng = np.random.default_rng(seed)
+    n_features = model.n_features_in_
+    thresholds = [[] for _ in range(n_features)]
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        split = tree.children_left >= 0
+        for feature, threshold in zip(tree.feature[split], tree.threshold[split]):
+            thresholds[feature].append(threshold)
+    X = np.zeros((n_rows, n_features))
+    for feature, values in enumerate(thresholds):
+        values = np.asarray(values or [0.0])
+        low, high = values.min(), values.max()
+        span = max(high - low, 1.0)
+        X[:, feature] = rng.uniform(low - 0.1 * span, high + 0.1 * span, n_rows)
+        exact = rng.random(n_rows) < 0.2
+        X[exact, feature] = rng.choice(values, exact.sum())
+    return X
+
+
+def max_difference(model, packed, X):
+    """导出的模型与原模型在样本 X 上输出的最大绝对差"""
+    if packed.kind == 'classifier':
+        return float(np.abs(model.predict_proba(X) - packed.predict_proba(X)).max())
+    return float(np.abs(model.predict(X) - packed.predict(X)).max())
+
+
+def export_forest(pkl_path, npz_path=None, tolerance=TOLERANCE):
+    """把 pkl 中的随机森林导出为 .npz，并在随机样本上与原模型比对，返回 (导出路径, 最大差异)"""
+    with open(pkl_path, 'rb') as f:
+        raw = f.read()
+    model = pickle.loads(raw)
+    arrays = pack_forest(model, hashlib.sha256(raw).hexdigest())
+    difference = max_difference(model, PackedForest(arrays), check_rows(model))
+    if difference > tolerance:
+        raise ValueError(f'{pkl_path} 导出结果与原模型不一致（最大差异 {difference:.3g}）')
+    npz_path = npz_path or packed_path(pkl_path)
+    tmp_path = f'{npz_path}.{os.getpid()}.tmp.npz'
+    np.savez(tmp_path, **arrays)  # 不压缩：加载时直接读出数组
+    os.replace(tmp_path, npz_path)
+    return npz_path, difference
+
+
+# ---------------------- 加载 ----------------------
+def loads(raw):
+    """从 .npz 文件内容构建 PackedForest（供模型注册表按后缀调用）"""
+    with np.load(io.BytesIO(raw), allow_pickle=False) as data:
+        return PackedForest({name: data[name] for name in data.files})
+
+
+def packed_path(pkl_path):
+    """pkl 模型对应的导出文件路径"""
+    return os.path.splitext(pkl_path)[0] + '.npz'
+
+
+_lock = threading.Lock()
+_resolved = {}  # 导出文件路径 -> ((pkl 签名, npz 签名), 导出文件是否与 pkl 一致)
+
+
+def _is_current(pkl_path, npz_path):
+    """导出文件记录的源文件哈希是否与当前 pkl 一致（pkl 被替换后旧的导出文件不再使用）"""
+    with open(pkl_path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    with open(npz_path, 'rb') as f:
+        with np.load(f, allow_pickle=False) as data:
+            return str(data['source_sha256']) == digest
+
+
+def preferred_model_path(pkl_path):
+    """优先使用与 pkl 内容一致的 .npz 导出文件（加载时无需 scikit-learn），导出文件缺失或过期时退回 pkl
+
+    判断结果按两个文件的签名缓存，文件不变时不再重复计算哈希。
+    """
+    npz_path = packed_path(pkl_path)
+    if not os.path.exists(npz_path):
+        return pkl_path
+    if not os.path.exists(pkl_path):
+        return npz_path
+    key = (file_signature(pkl_path), file_signature(npz_path))
+    with _lock:
+        cached = _resolved.get(npz_path)
+        if cached is None or cached[0] != key:
+            _resolved[npz_path] = cached = (key, _is_current(pkl_path, npz_path))
+    return npz_path if cached[1] else pkl_path
+
+
+def main(argv=None):
+    """命令行入口：python packed_forest.py [rfc_model.pkl rfr_model.pkl ...]"""
+    parser = argparse.ArgumentParser(description='把随机森林 pkl 导出为无需 scikit-learn 即可加载的 .npz')
+    parser.add_argument('models', nargs='*', help='要导出的 pkl 文件，默认导出仓库中存在的模型')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='与原模型输出的最大允许差异')
+    args = parser.parse_args(argv)
+    models = args.models or [path for path in MODEL_PATHS if os.path.exists(path)]
+    for pkl_path in models:
+        npz_path, difference = export_forest(pkl_path, tolerance=args.tolerance)
+        print(f'{pkl_path} -> {npz_path}（{os.path.getsize(npz_path) / 1024:.0f} KB，与原模型最大差异 {difference:.3g}）')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# 多进程并行聚合：把数据按行切成若干分区（多文件输入则按文件分片），在进程池中分别计算部分聚合结果再合并；
+# 各列只复制一次到共享内存，工作进程直接在共享缓冲区上建视图，不再序列化传递 DataFrame
+import gc
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import reduce
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+WORKERS_ENV = "AGG_WORKERS"    # 并行聚合的工作进程数，默认等于 CPU 核数；设为 1 时始终在当前进程内计算
+MIN_PARTITION_ROWS = 250_000   # 每个分区至少的行数，数据不足两个分区时直接在当前进程内计算
+
+_lock = threading.Lock()
+_executor = None
+_executor_workers = 0
+
+
+def default_workers():
+    """工作进程数：环境变量 AGG_WORKERS，未设置时为 CPU 核数"""
+    value = os.environ.get(WORKERS_ENV, "")
+    return max(int(value), 1) if value.strip() else (os.cpu_count() or 1)
+
+
+def get_executor(workers):
+    """获取进程级共享的进程池（工作进程启动较慢，所有会话和重跑复用同一个池）
+
+    使用 spawn 方式启动：Streamlit 进程里有多个线程，fork 出的子进程可能继承被占用的锁。
+    """
+    global _executor, _executor_workers
+    with _lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_workers = workers
+        return _executor
+
+
+def discard_executor(executor):
+    """丢弃已损坏的进程池（工作进程被杀死或内存不足退出后，池中的所有任务都会失败），下次使用时重新创建"""
+    global _executor, _executor_workers
+    with _lock:
+        if _executor is executor:
+            _executor, _executor_workers = None, 0
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def merge_partials(partials):
+    """依次调用 merge() 合并各部分的聚合结果（累加器的 merge 返回自身）"""
+    return reduce(lambda merged, partial: merged.merge(partial), partials)
+
+
+class SharedColumns:
+    """把 DataFrame 的若干列复制到共享内存：分类列（以及字符串列）保存整数编码，类别随任务一起发送
+
+    类别取自整列，各分区的编码含义一致，部分结果可以直接按下标合并。
+    用作上下文管理器，退出时释放共享内存。
+    """
+
+    def __init__(self, df, columns):
+        self.n_rows = len(df)
+        self.specs = []    # [(列名, 共享内存名, dtype 字符串, 类别列表或 None)]
+        self._blocks = []
+        try:
+            for col in columns:
+                series = df[col]
+                categories = None
+                if series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+                    series = series.astype("category")
+                    categories = series.cat.categories.tolist()
+                    series = series.cat.codes
+                values = series.to_numpy()
+                block = SharedMemory(create=True, size=max(values.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+                self.specs.append((col, block.name, values.dtype.str, categories))
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach_partition(specs, n_rows, start, stop):
+    """在工作进程中挂载共享内存，返回 (第 start~stop 行的 DataFrame, 共享内存句柄列表)"""
+    blocks, columns = [], {}
+    for col, name, dtype, categories in specs:
+        block = SharedMemory(name=name)
+        blocks.append(block)
+        values = np.ndarray((n_rows,), np.dtype(dtype), buffer=block.buf)[start:stop]
+        columns[col] = pd.Categorical.from_codes(values, categories) if categories is not None else values
+    return pd.DataFrame(columns, copy=False), blocks
+
+
+def _fold_partition(fold, specs, n_rows, start, stop):
+    """工作进程中执行：对一个行分区计算部分聚合结果（结果只含计数和求和，序列化开销很小）"""
+    frame, blocks = _attach_partition(specs, n_rows, start, stop)
+    try:
+        return fold(frame)
+    finally:
+        # 先释放指向共享缓冲区的视图，才能关闭共享内存
+        del frame
+        gc.collect()
+        for block in blocks:
+            block.close()
+
+
+def partition_bounds(n_rows, n_parts):
+    """把 n_rows 行均匀切成 n_parts 个连续分区，返回 [(起始行, 结束行)]"""
+    edges = np.linspace(0, n_rows, n_parts + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def parallel_aggregate(df, columns, fold, workers=None):
+    """按行分区并行聚合：fold(DataFrame) 返回带 merge() 的累加器，各分区的结果合并后返回
+
+    fold 必须是模块级函数（工作进程按名称导入）。数据不足两个分区或只有一个工作进程时，
+    直接在当前进程内调用 fold(df)，结果与并行计算一致；进程池损坏时同样退回当前进程计算。
+    """
+    workers = workers or default_workers()
+    n_parts = min(workers, len(df) // MIN_PARTITION_ROWS)
+    if n_parts <= 1:
+        return fold(df)
+    with SharedColumns(df, columns) as shared:
+        executor = get_executor(workers)
+        try:
+            futures = [executor.submit(_fold_partition, fold, shared.specs, shared.n_rows, start, stop)
+                       for start, stop in partition_bounds(shared.n_rows, n_parts)]
+            return merge_partials([future.result() for future in futures])
+        except BrokenProcessPool:
+            discard_executor(executor)
+    return fold(df)
+
+
+def aggregate_files(paths, fold_file, workers=None):
+    """按文件分片并行聚合：每个工作进程自行读取一个文件并返回 fold_file(路径) 的累加器，再合并
+
+    适用于按日期、学校等拆成多个文件的导出数据，文件内容不经过主进程。
+    """
+    paths = list(paths)
+    workers = workers or default_workers()
+    if workers <= 1 or len(paths) <= 1:
+        return merge_partials([fold_file(path) for path in paths])
+    executor = get_executor(workers)
+    try:
+        return merge_partials(list(executor.map(fold_file, paths)))
+    except BrokenProcessPool:
+        discard_executor(executor)
+    return merge_partials([fold_file(path) for path in paths])
@@ -0,0 +1,104 @@
+# 企鹅分类器批量预测：上传调查CSV，分块向量化编码并预测，输出带预测结果的CSV
+import argparse
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+
+from feature_encoding import encoder_for
+from model_registry import load_artifact
+from penguin_model import CATEGORICAL_COLUMNS, MODEL_PATH, OUTPUT_UNIQUES_PATH
+
+CHUNK_SIZE = 50_000           # 每块预测的行数：一次 predict_proba 处理一整块
+PREDICTION_COLUMN = '预测物种'
+PROBABILITY_PREFIX = '概率_'
+# 上传文件无法解码或不是CSV时 read_csv 抛出的异常（页面捕获后提示，不显示调用栈）
+CSV_READ_ERRORS = (UnicodeDecodeError, pd.errors.ParserError, pd.errors.EmptyDataError)
+
+
+def sniff_encoding(sample):
+    """判断CSV字节内容的编码：优先UTF-8（含BOM），否则按GBK处理（仓库中的数据集为GBK编码）"""
+    # 截掉末尾几个字节，避免多字节字符被截断导致误判
+    try:
+        sample[:-4].decode('utf-8')
+    except UnicodeDecodeError:
+        return 'gbk'
+    return 'utf-8-sig'
+
+
+def score_chunk(chunk, rfc_model, output_uniques_map):
+    """对一块数据做预测，返回追加了预测物种和各物种概率列的数据块
+
+    缺少模型所需的列时抛出 MissingColumnsError；数值特征有缺失的行无法预测，对应结果留空。
+    """
+    encoder = encoder_for(rfc_model, CATEGORICAL_COLUMNS)
+    encoder.check_columns(chunk.columns)
+    features = encoder.encode_frame(chunk)
+    valid = ~np.isnan(features).any(axis=1)
+    scored = chunk.copy()
+    species = np.full(len(chunk), None, dtype=object)
+    proba = np.full((len(chunk), len(rfc_model.classes_)), np.nan)
+    if valid.any():
+        proba[valid] = rfc_model.predict_proba(features[valid])
+        codes = rfc_model.classes_[proba[valid].argmax(axis=1)]
+        species[valid] = np.asarray(output_uniques_map)[codes]
+    scored[PREDICTION_COLUMN] = species
+    for col, code in enumerate(rfc_model.classes_):
+        scored[f'{PROBABILITY_PREFIX}{output_uniques_map[code]}'] = proba[:, col].round(4)
+    return scored
+
+
+def iter_scored_chunks(source, encoding=None, chunksize=CHUNK_SIZE):
+    """逐块读取CSV（路径或文件对象）并预测，逐块产出结果，内存占用与文件大小无关"""
+    rfc_model = load_artifact(MODEL_PATH)
+    output_uniques_map = load_artifact(OUTPUT_UNIQUES_PATH)
+    if encoding is None:
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                encoding = sniff_encoding(f.read(65536))
+        else:
+            encoding = sniff_encoding(source.read(65536))
+            source.seek(0)
+    for chunk in pd.read_csv(source, encoding=encoding, chunksize=chunksize):
+        yield score_chunk(chunk, rfc_model, output_uniques_map)
+
+
+def score_csv_bytes(raw, chunksize=CHUNK_SIZE):
+    """对上传的CSV字节内容做批量预测，返回 (结果CSV字节, 结果预览, 总行数)
+
+    结果按块依次写入同一个缓冲区，输出为带BOM的UTF-8，便于直接用Excel打开。
+    """
+    output = io.StringIO()
+    preview, total = None, 0
+    for idx, scored in enumerate(iter_scored_chunks(io.BytesIO(raw), chunksize=chunksize)):
+        scored.to_csv(output, index=False, header=(idx == 0))
+        if preview is None:
+            preview = scored.head(20)
+        total += len(scored)
+    return output.getvalue().encode('utf-8-sig'), preview, total
+
+
+def main(argv=None):
+    """命令行入口：python penguin_batch.py 输入.csv -o 输出.csv"""
+    parser = argparse.ArgumentParser(description='企鹅物种批量预测')
+    parser.add_argument('input', help='待预测的CSV文件（列格式同 penguins-chinese.csv）')
+    parser.add_argument('-o', '--output', help='结果CSV路径，不指定则输出到标准输出')
+    parser.add_argument('--encoding', help='输入文件编码，默认自动识别UTF-8/GBK')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help='每块预测的行数')
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'w', encoding='utf-8-sig', newline='') if args.output else sys.stdout
+    try:
+        total = 0
+        for idx, scored in enumerate(iter_scored_chunks(args.input, args.encoding, args.chunksize)):
+            scored.to_csv(out, index=False, header=(idx == 0))
+            total += len(scored)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f'已完成 {total} 行预测', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+# 企鹅分类模型的约定：模型文件、物种名称映射与训练时做了 one-hot 编码的原始列（页面、批量预测、预测服务和启动预热共用）
+# 不导入任何第三方库，单条预测页面引用这些常量、加载物种名称时不会连带导入 pandas
+import json
+import pickle
+
+MODEL_PATH = 'rfc_model.pkl'
+# 物种名称（下标即模型输出的类别编码）保存为 JSON 列表；训练时导出的 output_uniques.pkl 是 pandas Index，反序列化会导入 pandas
+OUTPUT_UNIQUES_PATH = 'output_uniques.json'
+OUTPUT_UNIQUES_PKL = 'output_uniques.pkl'
+CATEGORICAL_COLUMNS = ('企鹅栖息的岛屿', '性别')
+
+
+def export_species_labels(pkl_path=OUTPUT_UNIQUES_PKL, json_path=OUTPUT_UNIQUES_PATH):
+    """把训练时保存的物种名称（pandas Index）导出为 JSON 列表，重新训练模型后执行一次；返回物种名称列表"""
+    with open(pkl_path, 'rb') as f:
+        labels = [str(label) for label in pickle.load(f)]
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(labels, f, ensure_ascii=False)
+        f.write('\n')
+    return labels
+
+
+if __name__ == '__main__':
+    print(f'{OUTPUT_UNIQUES_PKL} -> {OUTPUT_UNIQUES_PATH}：{export_species_labels()}')
@@ -0,0 +1,306 @@
+# 无界面预测服务：用 tornado（asyncio）在本地提供三个模型的 HTTP 接口，把短时间窗口内的并发请求合并成一批，一次向量化预测
+import argparse
+import asyncio
+import json
+import sys
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+import tornado.web
+
+from feature_encoding import encoder_for
+from forest_quantiles import predict_with_quantiles
+from insurance_model import CATEGORICAL_COLUMNS as INSURANCE_CATEGORICAL
+from insurance_model import MODEL_PATH as INSURANCE_MODEL_PATH
+from model_registry import artifact_info, load_artifact
+from packed_forest import preferred_model_path
+from penguin_model import CATEGORICAL_COLUMNS as PENGUIN_CATEGORICAL
+from penguin_model import MODEL_PATH as PENGUIN_MODEL_PATH
+from penguin_model import OUTPUT_UNIQUES_PATH
+from prediction_cache import cached_predict, prediction_cache
+from student_batch import grade_tiers
+from student_data import CSV_PATH as STUDENT_CSV_PATH
+from student_data import load_student_data
+from student_model import CATEGORICAL_FEATURES as STUDENT_CATEGORICAL
+from student_model import score_model_for
+from warmup import WARMUP, dummy_input
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8600
+BATCH_WINDOW = 0.005    # 合并请求的时间窗口（秒）
+MAX_BATCH_SIZE = 512    # 单批最多的记录数，攒满立即预测
+
+
+class Predictor(ABC):
+    """一个模型的预测逻辑：把一批原始记录编码成矩阵，做一次向量化预测，返回每条记录的结果"""
+    name = None
+    categorical = ()
+
+    @abstractmethod
+    def load_model(self):
+        """返回当前模型（通常经由进程级缓存获取）"""
+
+    @abstractmethod
+    def version(self, model):
+        """返回模型版本，作为预测结果缓存的键的一部分"""
+
+    @abstractmethod
+    def format_results(self, model, X):
+        """对编码后的矩阵 X 做一次预测，返回每行的结果（可序列化为 JSON）"""
+
+    def required_columns(self):
+        """请求记录必须包含的原始列（数值列 + 分类列），按当前模型的特征名确定"""
+        encoder = encoder_for(self.load_model(), self.categorical)
+        return [column for _, column in encoder.numeric], list(self.categorical)
+
+    def warm_up(self):
+        """加载模型并对一行试输入预测一次（不经过结果缓存）"""
+        model = self.load_model()
+        self.format_results(model, dummy_input(encoder_for(model, self.categorical)))
+
+    def predict(self, records):
+        model = self.load_model()
+        X = encoder_for(model, self.categorical).encode_frame(pd.DataFrame.from_records(records))
+        # 批内已缓存的行直接返回，只对其余行做一次预测（缓存的是接口返回的结果，与页面的缓存分开）
+        return cached_predict(self.cache_name, self.version(model), X, lambda rows: self.format_results(model, rows))
+
+    @property
+    def cache_name(self):
+        return f'service.{self.name}'
+
+
+class PenguinPredictor(Predictor):
+    """企鹅物种分类（随机森林分类器）"""
+    name = 'penguin'
+    categorical = PENGUIN_CATEGORICAL
+
+    def load_model(self):
+        return load_artifact(preferred_model_path(PENGUIN_MODEL_PATH))
+
+    def version(self, model):
+        return artifact_info(preferred_model_path(PENGUIN_MODEL_PATH)).sha256
+
+    def format_results(self, model, X):
+        species = np.asarray(load_artifact(OUTPUT_UNIQUES_PATH))[model.classes_]
+        proba = model.predict_proba(X)
+        return [
+            {'species': species[row.argmax()],
+             'probabilities': {name: round(float(p), 4) for name, p in zip(species, row)}}
+            for row in proba
+        ]
+
+
+class InsurancePredictor(Predictor):
+    """医疗费用预测（随机森林回归，附带 P10/P50/P90 区间）"""
+    name = 'insurance'
+    categorical = INSURANCE_CATEGORICAL
+
+    def load_model(self):
+        return load_artifact(preferred_model_path(INSURANCE_MODEL_PATH))
+
+    def version(self, model):
+        return artifact_info(preferred_model_path(INSURANCE_MODEL_PATH)).sha256
+
+    def format_results(self, model, X):
+        mean, quantiles = predict_with_quantiles(model, X)
+        return [
+            {'charges': round(float(m), 2), 'p10': round(float(q[0]), 2),
+             'p50': round(float(q[1]), 2), 'p90': round(float(q[2]), 2)}
+            for m, q in zip(mean, quantiles)
+        ]
+
+
+class StudentPredictor(Predictor):
+    """学生期末成绩预测（最小二乘线性回归）"""
+    name = 'student'
+    categorical = STUDENT_CATEGORICAL
+
+    def load_model(self):
+        return score_model_for(load_student_data(STUDENT_CSV_PATH), STUDENT_CSV_PATH)
+
+    def version(self, model):
+        return model.version
+
+    def format_results(self, model, X):
+        predicted = np.clip(np.round(model.predict(X), 1), 0, 100)
+        return [{'final_score': float(score), 'tier': str(tier)}
+                for score, tier in zip(predicted, grade_tiers(predicted))]
+
+
+class MicroBatcher:
+    """把短时间窗口内提交的记录合并成一批，在线程池中调用一次 predict，再把结果分发给各个请求"""
+
+    def __init__(self, predict, window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE):
+        self.predict = predict
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = []   # [(记录, Future)]
+        self._timer = None
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    async def submit(self, record):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future))
+        self.requests += 1
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        records = [record for record, _ in batch]
+        try:
+            outcomes = [(result, None) for result in await loop.run_in_executor(None, self.predict, records)]
+        except Exception as e:
+            # 整批失败时逐条重新预测，只让出错的记录失败，不连累同一批中其他请求的合法记录
+            outcomes = [(None, e)] if len(records) == 1 else await loop.run_in_executor(None, self._predict_each, records)
+        for (_, future), (result, error) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _predict_each(self, records):
+        """逐条预测，返回每条记录的 (结果, 异常)"""
+        outcomes = []
+        for record in records:
+            try:
+                outcomes.append((self.predict([record])[0], None))
+            except Exception as e:
+                outcomes.append((None, e))
+        return outcomes
+
+    def stats(self):
+        return {
+            'requests': self.requests, 'batches': self.batches, 'largest_batch': self.largest_batch,
+            'avg_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+def validate_record(record, numeric, categorical):
+    """检查单条记录的字段和类型，返回错误信息；合法时返回 None"""
+    if not isinstance(record, dict):
+        return '每条记录必须是 JSON 对象'
+    missing = [column for column in numeric + categorical if column not in record]
+    if missing:
+        return f'缺少字段：{missing}'
+    bad = [column for column in numeric
+           if isinstance(record[column], bool) or not isinstance(record[column], (int, float))]
+    bad += [column for column in categorical if not isinstance(record[column], str)]
+    if bad:
+        return f'字段类型错误：{bad}'
+    return None
+
+
+class JsonHandler(tornado.web.RequestHandler):
+    def write_json(self, data, status=200):
+        self.set_status(status)
+        self.set_header('Content-Type', 'application/json; charset=utf-8')
+        self.finish(json.dumps(data, ensure_ascii=False))
+
+
+class PredictHandler(JsonHandler):
+    """POST 单条记录（JSON 对象）返回单个结果；POST 记录数组返回结果数组"""
+
+    def initialize(self, predictor, batcher):
+        self.predictor = predictor
+        self.batcher = batcher
+
+    async def post(self):
+        try:
+            body = json.loads(self.request.body)
+        except ValueError:
+            return self.write_json({'error': '请求体不是合法的 JSON'}, 400)
+        records = body if isinstance(body, list) else [body]
+        try:
+            # 冷缓存时需要加载模型（或等待预热线程加载完成），放到线程池中执行，不阻塞事件循环
+            numeric, categorical = await asyncio.get_running_loop().run_in_executor(None, self.predictor.required_columns)
+        except FileNotFoundError as e:
+            return self.write_json({'error': f'未找到模型文件：{e.filename}'}, 503)
+        for idx, record in enumerate(records):
+            problem = validate_record(record, numeric, categorical)
+            if problem:
+                return self.write_json({'error': problem, 'index': idx}, 400)
+        results = await asyncio.gather(*(self.batcher.submit(record) for record in records))
+        self.write_json(results if isinstance(body, list) else results[0])
+
+
+class ReadyHandler(JsonHandler):
+    """GET 返回启动预热的进度：全部模型预热成功（或模型文件缺失）时为 200，仍在预热或出错时为 503（供部署时的健康检查轮询）"""
+
+    def get(self):
+        status = WARMUP.status()
+        self.write_json(status, 200 if status['ready'] else 503)
+
+
+class HealthHandler(JsonHandler):
+    """GET 返回各模型接口的请求数、批处理统计与结果缓存命中情况"""
+
+    def initialize(self, batchers):
+        self.batchers = batchers
+
+    def get(self):
+        self.write_json({
+            name: {**batcher.stats(), 'cache': prediction_cache(PREDICTORS[name].cache_name).stats()}
+            for name, batcher in self.batchers.items()
+        })
+
+
+PREDICTORS = {predictor.name: predictor
+              for predictor in (PenguinPredictor(), InsurancePredictor(), StudentPredictor())}
+
+
+def make_app(window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE):
+    """创建服务：每个模型一个 /predict/<名称> 接口，外加 /health 和 /ready"""
+    batchers = {name: MicroBatcher(predictor.predict, window, max_batch_size)
+                for name, predictor in PREDICTORS.items()}
+    routes = [(f'/predict/{name}', PredictHandler, {'predictor': predictor, 'batcher': batchers[name]})
+              for name, predictor in PREDICTORS.items()]
+    routes.append(('/health', HealthHandler, {'batchers': batchers}))
+    routes.append(('/ready', ReadyHandler))
+    return tornado.web.Application(routes)
+
+
+def warm_up():
+    """启动时在后台线程中预热各模型，服务立即开始监听；缺失的模型在 /ready 中标为 missing，对应接口返回 503"""
+    WARMUP.start({name: predictor.warm_up for name, predictor in PREDICTORS.items()})
+
+
+async def serve(host, port, window, max_batch_size):
+    warm_up()
+    make_app(window, max_batch_size).listen(port, address=host)
+    print(f'预测服务已启动：http://{host}:{port}', file=sys.stderr)
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    """命令行入口：python predict_service.py --port 8600 --window-ms 5 --max-batch 512"""
+    parser = argparse.ArgumentParser(description='企鹅分类、医疗费用、学生成绩预测的本地 HTTP 服务')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='监听地址，默认只监听本机')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='监听端口')
+    parser.add_argument('--window-ms', type=float, default=BATCH_WINDOW * 1000, help='合并请求的时间窗口（毫秒）')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH_SIZE, help='单批最多的记录数')
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, args.window_ms / 1000, args.max_batch))
+
+
+if __name__ == '__main__':
+    main()
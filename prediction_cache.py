@@ -0,0 +1,75 @@
+# 预测结果缓存：以模型版本和编码后的特征向量为键，重复提交相同输入时直接返回上次的预测结果
+import threading
+
+from cachetools import TTLCache
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')  # 第一次预测时才导入
+
+MAX_ENTRIES = 4096    # 每个模型最多缓存的结果条数（超出时淘汰最久未使用的）
+TTL_SECONDS = 3600    # 结果的有效期（秒）
+
+_MISSING = object()
+
+
+class PredictionCache:
+    """单个模型的预测结果缓存（LRU + 过期时间），模型版本变化时整体清空"""
+
+    def __init__(self, maxsize=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self._lock = threading.Lock()
+        self._entries = TTLCache(maxsize, ttl)
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def predict(self, version, X, predict):
+        """逐行查缓存，未命中的行合并后调用一次 predict(矩阵)，返回与行一一对应的结果列表
+
+        version 为模型产物的版本（如 pkl 文件的 SHA-256），模型文件被替换后旧结果全部失效。
+        """
+        # 编码后的 float64 行向量即规范化的键（加 0.0 把 -0.0 统一为 0.0）
+        X = np.ascontiguousarray(X, dtype=np.float64) + 0.0
+        keys = [row.tobytes() for row in X]
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+            results = [self._entries.get(key, _MISSING) for key in keys]
+            missing = [idx for idx, result in enumerate(results) if result is _MISSING]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            computed = list(predict(X[missing]))
+            with self._lock:
+                if version == self.version:
+                    for idx, value in zip(missing, computed):
+                        self._entries[keys[idx]] = value
+            for idx, value in zip(missing, computed):
+                results[idx] = value
+        return results
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+_lock = threading.Lock()
+_caches = {}  # 模型名称 -> PredictionCache（进程级，所有会话共享）
+
+
+def prediction_cache(name):
+    """获取（必要时创建）某个模型的进程级预测缓存"""
+    with _lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = PredictionCache()
+        return cache
+
+
+def cached_predict(name, version, X, predict):
+    """通过进程级缓存预测，返回与 X 各行对应的结果列表"""
+    return prediction_cache(name).predict(version, X, predict)
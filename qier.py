@@ -1,7 +1,15 @@
 # 第8章/streamlit_predict_v2.py
 import streamlit as st  # 导入Streamlit库，用于构建Web应用
-import pickle  # 导入pickle库，用于加载预训练模型
-import pandas as pd  # 导入Pandas库，用于数据处理
+from model_registry import load_artifact, artifact_info  # 进程级模型注册表：所有会话共享已加载的模型
+from packed_forest import preferred_model_path  # 优先加载导出的紧凑随机森林（.npz），无需导入 scikit-learn
+from prediction_cache import cached_predict, prediction_cache  # 预测结果缓存：相同输入直接返回上次的结果
+from image_assets import FULL_WIDTH, image_bytes, preload_images  # 图片资源缓存：按显示宽度缩放压缩后常驻内存
+from instrumentation import finish_rerun, mark_section, start_rerun, timed_section  # 按需开启的重跑性能分析
+from lazy_imports import lazy_module  # 延迟导入：只在用到的页面才导入 pandas 等重量级库
+from penguin_model import CATEGORICAL_COLUMNS, MODEL_PATH, OUTPUT_UNIQUES_PATH  # 模型文件与 one-hot 编码的原始列（不依赖 pandas）
+
+feature_encoding = lazy_module('feature_encoding')  # 特征编码器：单条与批量预测共用的 one-hot 编码
+penguin_batch = lazy_module('penguin_batch')  # 批量预测：分块向量化编码并预测（依赖 pandas）
 
 # 设置页面的标题、图标和布局
 st.set_page_config(
@@ -10,6 +18,16 @@ st.set_page_config(
     layout='wide'             # 布局模式：宽屏模式（默认是居中窄屏）
 )
 
+# 按需开启重跑性能分析（环境变量 APP_PROFILE=1 或地址加 ?profile=1），以下各段分别计时
+start_rerun('qier')
+mark_section('图片预加载')
+
+# 启动时按显示宽度预先生成页面用到的图片（已生成的直接复用，之后每次交互不再读取原图）
+preload_images(
+    [('images/rigth_logo.png', 100), ('images/rigth_logo.png', 300), ('images/penguins.png', FULL_WIDTH)]
+    + [(f'images/{species}.png', 300) for species in ('阿德利企鹅', '巴布亚企鹅', '帽带企鹅')]
+)
+
 # 自定义CSS设置马卡龙浅蓝色背景（通过markdown嵌入HTML/CSS，实现页面样式美化）
 st.markdown("""
     <style>
@@ -55,17 +73,19 @@ st.markdown("""
     """, unsafe_allow_html=True)  # 允许执行HTML代码（Streamlit默认禁用，需显式开启）
 
 # 使用侧边栏实现多页面显示效果（Streamlit的with语法：将内容包裹在侧边栏容器中）
+mark_section('侧边栏')
 with st.sidebar:
-    st.image('images/rigth_logo.png', width=100)  # 侧边栏显示logo图片（width设置宽度为100像素）
+    st.image(image_bytes('images/rigth_logo.png', 100), width=100)  # 侧边栏显示logo图片（width设置宽度为100像素）
     st.title('请选择页面')  # 侧边栏标题
     page = st.selectbox(
         "请选择页面", 
-        ["简介页面", "预测分类页面"],  # 下拉选择框的选项
+        ["简介页面", "预测分类页面", "批量预测页面"],  # 下拉选择框的选项
         label_visibility='collapsed'  # 隐藏选择框的label文字
     )  # 定义页面选择器，返回用户选择的页面名称
 
 # 简介页面逻辑：当用户选择“简介页面”时执行
 if page == "简介页面":
+    mark_section('页面：简介')
     st.title("企鹅分类器:penguin:")  # 页面标题（带企鹅emoji）
     st.header('数据集介绍')  # 二级标题
     st.markdown("""
@@ -74,10 +94,11 @@ if page == "简介页面":
 该数据集记录了 344 行观测数据，包含 3 个不同物种的企鹅：阿德利企鹅、巴布亚企鹅和帽带企鹅的各种信息。
     """)  # 用markdown格式显示数据集说明
     st.header('三种企鹅的卡通图像')  # 二级标题
-    st.image('images/penguins.png')  # 显示企鹅图片
+    st.image(image_bytes('images/penguins.png'))  # 显示企鹅图片
 
 # 预测分类页面逻辑：当用户选择“预测分类页面”时执行
 elif page == "预测分类页面":
+    mark_section('页面：预测分类')
     st.header("预测企鹅分类")  # 二级标题
     st.markdown("这个 Web 应用是基于帕尔默群岛企鹅数据集构建的模型。只需输入 6 个信息，就可以预测企鹅的物种，使用下面的表单开始预测吧！")  # 功能说明
     
@@ -96,56 +117,81 @@ elif page == "预测分类页面":
             body_mass = st.number_input('身体质量（克）', min_value=0.0)  # 数字输入框（体重）
             submitted = st.form_submit_button('预测分类')  # 表单提交按钮（点击后submitted为True）
         
-        # 初始化数据预处理格式中与岛屿相关的变量（one-hot编码：将分类变量转为模型可识别的数值）
-        island_biscoe, island_dream, island_torgerson = 0, 0, 0
-        # 根据用户输入的岛屿数据更改对应的值
-        if island == '比斯科群岛':
-            island_biscoe = 1
-        elif island == '德里姆岛':
-            island_dream = 1
-        elif island == '托尔森岛':
-            island_torgerson = 1
-        
-        # 初始化数据预处理格式中与性别相关的变量（one-hot编码）
-        sex_female, sex_male = 0, 0
-        # 根据用户输入的性别数据更改对应的值
-        if sex == '雌性':
-            sex_female = 1
-        elif sex == '雄性':
-            sex_male = 1
-        
-        # 整理为模型可接收的格式化数据（按模型训练时的特征顺序排列）
-        format_data = [
-            bill_length, bill_depth, flipper_length, body_mass,
-            island_dream, island_torgerson, island_biscoe, sex_male, sex_female
-        ]
-        
-        # 使用pickle加载预训练的随机森林模型（rb：以二进制只读模式打开文件）
-        with open('rfc_model.pkl', 'rb') as f:
-            rfc_model = pickle.load(f)  # 加载模型到rfc_model变量
+        # 整理为原始记录（列名与训练数据集一致），由编码器按模型训练时的特征顺序做 one-hot 编码
+        record = {
+            '企鹅栖息的岛屿': island, '性别': sex,
+            '喙的长度': bill_length, '喙的深度': bill_depth,
+            '翅膀的长度': flipper_length, '身体质量': body_mass
+        }
         
-        # 使用pickle加载物种编码与名称的映射对象（用于将模型输出的数字编码转为物种名）
-        with open('output_uniques.pkl', 'rb') as f:
-            output_uniques_map = pickle.load(f)
+        with timed_section('模型加载'):
+            # 从模型注册表获取预训练的随机森林模型（每个进程只反序列化一次，模型文件更新后自动重新加载）
+            # 存在与 pkl 一致的 rfc_model.npz 时加载导出的紧凑森林，单条预测也不再经过 scikit-learn
+            rfc_model_path = preferred_model_path(MODEL_PATH)
+            rfc_model = load_artifact(rfc_model_path)
+            
+            # 获取物种名称列表（下标即模型输出的数字编码；保存为 JSON，加载时无需导入 pandas）
+            output_uniques_map = load_artifact(OUTPUT_UNIQUES_PATH)
         
         # 表单提交后执行预测（当用户点击“预测分类”按钮时）
         if submitted:
-            # 构造与训练时一致的数据框，解决警告信息（用模型的feature_names_in_保证特征名匹配）
-            format_data_df = pd.DataFrame(
-                data=[format_data],  # 输入数据（一行）
-                columns=rfc_model.feature_names_in_  # 特征名（与训练时一致）
-            )
-            # 使用模型对格式化后的数据进行预测，返回预测的类别代码
-            predict_result_code = rfc_model.predict(format_data_df)
+            with timed_section('预测'):
+                # 用根据模型feature_names_in_编译的编码器，把记录编码为与训练时列顺序一致的特征数组
+                format_data = feature_encoding.encoder_for(rfc_model, CATEGORICAL_COLUMNS).encode_record(record)
+                # 使用模型对格式化后的数据进行预测，返回预测的类别代码（以模型版本和特征向量为键缓存，重复输入直接命中）
+                predict_result_code = cached_predict(
+                    'penguin', artifact_info(rfc_model_path).sha256, format_data, rfc_model.predict
+                )[0]
             # 将类别代码映射到具体的物种名称
-            predict_result_species = output_uniques_map[predict_result_code][0]
+            predict_result_species = output_uniques_map[predict_result_code]
             # 输出预测结果（加粗展示：用**包裹文本）
             st.write(f'根据您输入的数据，预测该企鹅的物种名称是：**{predict_result_species}**')
     
+    # 在侧边栏展示模型的加载成本（加载耗时与常驻内存）
+    with st.sidebar:
+        with st.expander('模型加载信息'):
+            for artifact in (rfc_model_path, OUTPUT_UNIQUES_PATH):
+                info = artifact_info(artifact)
+                memory = '未知' if info.memory_bytes is None else f'{info.memory_bytes / 1024:.1f} KB'
+                st.caption(
+                    f'{artifact}：加载耗时 {info.load_seconds * 1000:.1f} 毫秒，'
+                    f'常驻内存 {memory}，缓存命中 {info.hits} 次'
+                )
+            stats = prediction_cache('penguin').stats()
+            st.caption(f"预测结果缓存：命中 {stats['hits']} 次，未命中 {stats['misses']} 次，已缓存 {stats['entries']} 条")
+    
     with col_logo:  # 第三个列（占比2）：用于放图片
         if not submitted:
             # 未提交时显示logo
-            st.image('images/rigth_logo.png', width=300)
+            st.image(image_bytes('images/rigth_logo.png', 300), width=300)
         else:
             # 提交后显示对应企鹅物种的图片（根据预测结果拼接图片路径）
-            st.image(f'images/{predict_result_species}.png', width=300)
\ No newline at end of file
+            st.image(image_bytes(f'images/{predict_result_species}.png', 300), width=300)
+
+# 批量预测页面逻辑：上传整份野外调查CSV，一次性预测全部企鹅并下载结果
+elif page == "批量预测页面":
+    mark_section('页面：批量预测')
+    st.header("批量预测企鹅分类")
+    st.markdown("上传与 `penguins-chinese.csv` 列格式相同的CSV文件（支持UTF-8/GBK编码），系统将分块批量预测每只企鹅的物种，并提供带预测结果的CSV下载。")
+    
+    uploaded_file = st.file_uploader('上传调查数据CSV', type=['csv'])  # 文件上传控件
+    if uploaded_file is not None:
+        result_bytes = None
+        try:
+            with st.spinner('正在批量预测...'), timed_section('批量预测'):
+                result_bytes, preview, total = penguin_batch.score_csv_bytes(uploaded_file.getvalue())
+        except feature_encoding.MissingColumnsError as e:
+            st.error(f'❌ 上传的文件缺少必要列：{e.missing}')
+        except penguin_batch.CSV_READ_ERRORS as e:
+            st.error(f'❌ 无法读取上传的文件（请上传UTF-8或GBK编码的CSV文件）：{e}')
+        if result_bytes is not None:
+            st.success(f'已完成 {total} 行数据的预测（数值特征缺失的行无法预测，结果留空）')
+            st.dataframe(preview, use_container_width=True)  # 展示前20行预测结果
+            st.download_button(
+                '下载预测结果CSV',
+                data=result_bytes,
+                file_name=f'预测结果_{uploaded_file.name}',
+                mime='text/csv'
+            )
+
+finish_rerun()
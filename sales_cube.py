@@ -0,0 +1,145 @@
+# 销售数据立方体：按 (城市, 顾客类型, 性别, 小时, 产品类型) 预聚合销售额与评分，筛选时只需对立方体切片求和；
+# 每个 (城市, 顾客类型, 性别) 筛选单元格另存每单销售额的分位数草图和订单号去重计数器，切片时合并
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from frame_cache import derived_for
+from parallel_agg import parallel_aggregate
+from sketches import HyperLogLog, KLLSketch, group_order, merge_all, split_by_group
+
+CUBE_DIMENSIONS = ["city", "customer_type", "gender", "hour", "product_type"]
+CUBE_COLUMNS = CUBE_DIMENSIONS + ["sales", "rating", "order_id"]  # 构建立方体需要的全部列
+FILTER_DIMENSIONS = ["city", "customer_type", "gender"]  # 侧边栏可筛选的维度（立方体前三个轴）
+
+
+@dataclass
+class CubeSlice:
+    """筛选后的聚合结果：各数组形状均为 (小时数, 产品类型数)"""
+    hours: list
+    product_types: list
+    sales_sum: np.ndarray
+    rating_sum: np.ndarray
+    count: np.ndarray
+    sales_sketch: KLLSketch   # 所选单元格合并后的每单销售额分位数草图
+    order_ids: HyperLogLog    # 所选单元格合并后的订单号去重计数器
+
+    @property
+    def total_sales(self):
+        return float(self.sales_sum.sum())
+
+    @property
+    def order_count(self):
+        return int(self.count.sum())
+
+    @property
+    def avg_rating(self):
+        """平均评分（没有订单时为 NaN）"""
+        count = self.order_count
+        return float(self.rating_sum.sum()) / count if count else float("nan")
+
+    @property
+    def avg_per_order(self):
+        """每单平均销售额（没有订单时为 NaN）"""
+        count = self.order_count
+        return self.total_sales / count if count else float("nan")
+
+    def sales_quartiles(self):
+        """每单销售额的 (下四分位数, 中位数, 上四分位数) 近似值（没有订单时为 NaN）"""
+        return tuple(float(value) for value in self.sales_sketch.quantiles([0.25, 0.5, 0.75]))
+
+    @property
+    def distinct_orders(self):
+        """去重后的订单数（近似值，不超过订单行数）"""
+        return min(self.order_ids.count(), self.order_count)
+
+    def sales_by_hour(self):
+        """按小时汇总的销售额（只包含有订单的小时）"""
+        count = self.count.sum(axis=1)
+        return pd.DataFrame({"hour": self.hours, "sales": self.sales_sum.sum(axis=1)})[count > 0].reset_index(drop=True)
+
+    def sales_by_product(self):
+        """按产品类型汇总的销售额（只包含有订单的产品类型，按销售额降序）"""
+        count = self.count.sum(axis=0)
+        product_sales = pd.DataFrame({"product_type": self.product_types, "sales": self.sales_sum.sum(axis=0)})[count > 0]
+        return product_sales.sort_values("sales", ascending=False).reset_index(drop=True)
+
+
+class SalesCube:
+    """五维稠密立方体：每个单元格保存该组合下的销售额之和、评分之和与订单数"""
+
+    def __init__(self, labels, sales_sum, rating_sum, count, sales_sketches, order_ids):
+        self.labels = labels          # 维度名 -> 该维度的取值列表（即立方体各轴的刻度）
+        self.sales_sum = sales_sum
+        self.rating_sum = rating_sum
+        self.count = count
+        # 按筛选单元格编号（前三个轴展平）保存的草图
+        self.sales_sketches = sales_sketches
+        self.order_ids = order_ids
+
+    @classmethod
+    def build(cls, df):
+        """扫描一遍原始数据构建立方体：先把各维度转为整数编码，再按单元格编号 bincount"""
+        labels, codes = {}, []
+        for dim in CUBE_DIMENSIONS:
+            if dim == "hour":
+                labels[dim] = list(range(24))
+                codes.append(df[dim].to_numpy(dtype=np.intp))
+            else:
+                values = df[dim] if isinstance(df[dim].dtype, pd.CategoricalDtype) else df[dim].astype("category")
+                labels[dim] = values.cat.categories.tolist()
+                codes.append(values.cat.codes.to_numpy(dtype=np.intp))
+        shape = tuple(len(labels[dim]) for dim in CUBE_DIMENSIONS)
+        size = int(np.prod(shape))
+        cell = np.ravel_multi_index(codes, shape)
+        sales_sum = np.bincount(cell, weights=df["sales"].to_numpy(dtype=np.float64), minlength=size)
+        rating_sum = np.bincount(cell, weights=df["rating"].to_numpy(dtype=np.float64), minlength=size)
+        count = np.bincount(cell, minlength=size)
+        filter_shape = shape[:len(FILTER_DIMENSIONS)]
+        order, bounds = group_order(np.ravel_multi_index(codes[:len(FILTER_DIMENSIONS)], filter_shape), int(np.prod(filter_shape)))
+        sales_sketches = [KLLSketch().update(part) for part in split_by_group(df["sales"].to_numpy(dtype=np.float64), order, bounds)]
+        order_ids = [HyperLogLog().update(part) for part in split_by_group(df["order_id"].to_numpy(), order, bounds)]
+        return cls(labels, sales_sum.reshape(shape), rating_sum.reshape(shape), count.reshape(shape), sales_sketches, order_ids)
+
+    def merge(self, other):
+        """把另一部分数据的立方体累加进来（两者的各维度取值必须一致，例如按同一份分类编码分区构建）"""
+        if other.labels != self.labels:
+            raise ValueError("立方体维度取值不一致，无法合并")
+        self.sales_sum = self.sales_sum + other.sales_sum
+        self.rating_sum = self.rating_sum + other.rating_sum
+        self.count = self.count + other.count
+        for sketch, other_sketch in zip(self.sales_sketches, other.sales_sketches):
+            sketch.merge(other_sketch)
+        for ids, other_ids in zip(self.order_ids, other.order_ids):
+            ids.merge(other_ids)
+        return self
+
+    def slice(self, selections):
+        """按筛选条件切片：selections 为 维度名 -> 选中取值列表，同一维度内取并集、不同维度间取交集"""
+        index = []
+        for dim in FILTER_DIMENSIONS:
+            positions = {label: pos for pos, label in enumerate(self.labels[dim])}
+            index.append([positions[value] for value in selections[dim] if value in positions])
+        selector = np.ix_(*index)
+        filter_shape = self.count.shape[:len(FILTER_DIMENSIONS)]
+        cells = np.ravel_multi_index(np.meshgrid(*[np.asarray(i, dtype=np.intp) for i in index], indexing="ij"), filter_shape).ravel()
+        return CubeSlice(
+            hours=self.labels["hour"],
+            product_types=self.labels["product_type"],
+            sales_sum=self.sales_sum[selector].sum(axis=(0, 1, 2)),
+            rating_sum=self.rating_sum[selector].sum(axis=(0, 1, 2)),
+            count=self.count[selector].sum(axis=(0, 1, 2)),
+            sales_sketch=merge_all([self.sales_sketches[cell] for cell in cells], KLLSketch),
+            order_ids=merge_all([self.order_ids[cell] for cell in cells], HyperLogLog),
+        )
+
+
+def build_cube(df):
+    """构建立方体：数据量大时按行分区交给多个进程分别构建再合并"""
+    return parallel_aggregate(df, CUBE_COLUMNS, SalesCube.build)
+
+
+def cube_for(df):
+    """获取（必要时构建）数据对应的立方体，同一个 DataFrame 对象只构建一次"""
+    return derived_for(df, "sales_cube", build_cube)
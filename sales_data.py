@@ -0,0 +1,88 @@
+# 销售数据加载层：只解析一次Excel，转存为带分类类型的Parquet列式缓存，之后以内存映射方式读取
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from model_registry import file_signature
+
+XLSX_PATH = "（商场销售数据）supermarket_sales.xlsx"
+CACHE_DIR = ".cache"
+PARQUET_PATH = os.path.join(CACHE_DIR, "supermarket_sales.parquet")
+
+# Excel列名 -> 仪表板使用的列名（前7列与原模拟数据的列保持一致）
+COLUMN_NAMES = {
+    "城市": "city",
+    "顾客类型": "customer_type",
+    "性别": "gender",
+    "时间": "hour",
+    "产品类型": "product_type",
+    "总价": "sales",
+    "评分": "rating",
+    "订单号": "order_id",
+    "分店": "branch",
+    "单价": "unit_price",
+    "数量": "quantity",
+    "日期": "date",
+}
+CATEGORICAL_COLUMNS = ["city", "customer_type", "gender", "product_type", "branch"]
+
+# Parquet元数据中记录源Excel文件签名的键
+_SIGNATURE_KEY = b"source_signature"
+
+_lock = threading.Lock()
+_cache = {}  # 源文件签名 -> DataFrame（进程内缓存，所有会话共享）
+
+
+def parse_xlsx(xlsx_path=XLSX_PATH):
+    """解析原始Excel（第1行为表格标题，第2行为列名），转换为仪表板使用的列名和紧凑类型"""
+    df = pd.read_excel(xlsx_path, header=1)
+    df = df[list(COLUMN_NAMES)].rename(columns=COLUMN_NAMES)
+    # 时间列为 datetime.time 对象，仪表板只按小时统计
+    df["hour"] = pd.to_datetime(df["hour"].astype(str), format="%H:%M:%S").dt.hour.astype("int8")
+    df["quantity"] = df["quantity"].astype("int16")
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+    return df
+
+
+def _read_parquet(signature):
+    """读取Parquet缓存：源文件签名一致时以内存映射方式读取，否则返回 None"""
+    try:
+        metadata = pq.read_schema(PARQUET_PATH).metadata or {}
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    if metadata.get(_SIGNATURE_KEY) != repr(signature).encode():
+        return None
+    return pq.read_table(PARQUET_PATH, memory_map=True).to_pandas()
+
+
+def _write_parquet(df, signature):
+    """写入Parquet缓存（先写临时文件再替换，避免多个进程读到写了一半的文件）"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _SIGNATURE_KEY: repr(signature).encode()})
+    tmp_path = f"{PARQUET_PATH}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, PARQUET_PATH)
+
+
+def load_sales_data(xlsx_path=XLSX_PATH):
+    """加载销售数据：同一进程内直接复用；Excel修改时间或大小变化时重新解析并重建Parquet缓存"""
+    signature = file_signature(xlsx_path)
+    df = _cache.get(signature)
+    if df is not None:
+        return df
+    with _lock:
+        df = _cache.get(signature)
+        if df is None:
+            df = _read_parquet(signature)
+            if df is None:
+                df = parse_xlsx(xlsx_path)
+                _write_parquet(df, signature)
+            _cache.clear()
+            _cache[signature] = df
+    return df
+
@@ -0,0 +1,211 @@
+# 近似统计草图：KLL 分位数草图和 HyperLogLog 去重计数，体积固定且可以合并，
+# 按专业/筛选单元格分别保存，任意筛选组合的中位数、四分位数和去重人数只需合并几个小草图即可得到
+import copy
+import math
+import random
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RANK_ERROR = 0.0165  # KLL 默认秩误差（k=200 时约 1.65%，99% 置信）
+DEFAULT_COUNT_ERROR = 0.0163  # HyperLogLog 默认相对标准误差（精度 12，即 4096 个寄存器）
+
+
+def group_order(codes, n_groups):
+    """按组编号稳定排序，返回 (排序下标, 各组边界)，同一分组可用于拆分多列"""
+    order = np.argsort(codes, kind="stable")
+    return order, np.searchsorted(codes[order], np.arange(n_groups + 1))
+
+
+def split_by_group(values, order, bounds):
+    """按 group_order 的结果把一列数值拆成每组一个数组"""
+    values = values[order]
+    return [values[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+
+class KLLSketch:
+    """KLL 分位数草图：第 h 层的每个样本代表 2^h 个原始值，某层满了就排序后隔一个取一个提升到上一层
+
+    只保存 O(k·log(n/k)) 个样本，秩误差约 3.3/k；合并两个草图即逐层拼接后重新压缩。
+    压缩时的随机起点由草图自带的随机数生成器决定，相同数据按相同顺序加入时结果可重现。
+    """
+
+    def __init__(self, k=None, rank_error=DEFAULT_RANK_ERROR, seed=0):
+        self.k = k or math.ceil(3.3 / rank_error)
+        self._random = random.Random(seed)
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _capacity(self, level):
+        """各层容量：最高层为 k，每往下一层乘 2/3，最少 2 个"""
+        depth = len(self.levels) - level - 1
+        return max(math.ceil(self.k * (2 / 3) ** depth), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # 奇数个时留下一个在本层，其余从随机起点开始隔一个取一个，保证排名估计无偏
+                keep, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self._random.getrandbits(1)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                level = 0  # 层数增加后下层容量会变小，从头再检查一遍
+            else:
+                level += 1
+
+    def update(self, values):
+        """批量加入一组数值（忽略 NaN）"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """合并另一个草图"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted(self):
+        """全部样本按值排序，返回 (样本值, 累计权重)"""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        """估计一组分位点（0~1）对应的值；没有数据时返回 NaN"""
+        qs = np.asarray(qs, dtype=np.float64)
+        if not self.n:
+            return np.full(qs.shape, np.nan)
+        values, cumulative = self._weighted()
+        idx = np.searchsorted(cumulative, qs * cumulative[-1], side="left")
+        result = values[np.minimum(idx, len(values) - 1)]
+        # 两端用精确的最小/最大值
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, result))
+
+    def rank(self, x):
+        """估计小于等于 x 的数据所占比例"""
+        if not self.n:
+            return np.nan
+        values, cumulative = self._weighted()
+        pos = np.searchsorted(values, x, side="right")
+        return float(cumulative[pos - 1] / cumulative[-1]) if pos else 0.0
+
+    @property
+    def rank_error(self):
+        return 3.3 / self.k
+
+
+class HyperLogLog:
+    """HyperLogLog 去重计数：2^precision 个寄存器记录哈希值前导零个数的最大值，相对误差约 1.04/√寄存器数
+
+    哈希用 pandas 的固定密钥哈希，不同进程、不同数据块得到的寄存器可以直接逐个取最大值合并。
+    计数用 Ertl 的改进估计（按寄存器取值的直方图计算），在全部基数范围内无需切换到线性计数，
+    原始估计在约 2.5 倍寄存器数附近的偏差（4096 个寄存器、1 万个取值时约 +2%）不再出现。
+    """
+
+    def __init__(self, precision=None, error=DEFAULT_COUNT_ERROR):
+        self.precision = precision or min(max(math.ceil(math.log2((1.04 / error) ** 2)), 4), 18)
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    def update(self, values):
+        """批量加入一组取值（数值或字符串，忽略缺失值）"""
+        values = pd.Series(values).dropna().to_numpy()
+        if not len(values):
+            return self
+        hashes = pd.util.hash_array(values)
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        # 剩余 64-p 位中第一个 1 出现的位置；只取其中最高的 53 位，转成 float64 时不会丢精度
+        width = self._rank_bits
+        rest = (hashes << np.uint64(p)) >> np.uint64(64 - width)
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        """合并另一个计数器（精度必须一致）"""
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLog 精度不一致，无法合并")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @property
+    def _rank_bits(self):
+        """参与计算前导零的哈希位数，寄存器取值范围为 0 ~ _rank_bits + 1"""
+        return min(64 - self.precision, 53)
+
+    def count(self):
+        """估计去重后的取值个数（Ertl 2017 的改进原始估计）"""
+        m = len(self.registers)
+        q = self._rank_bits
+        histogram = np.bincount(self.registers, minlength=q + 2)
+        z = m * _tau(1 - histogram[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + histogram[k])
+        z += m * _sigma(histogram[0] / m)
+        return int(round(m * m / (2 * math.log(2)) / z))
+
+    @property
+    def error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+def _sigma(x):
+    """改进估计中空寄存器比例的修正项：x + Σ x^(2^k)·2^(k-1)"""
+    if x == 1.0:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        z_old = z
+        z += x * y
+        y += y
+        if z == z_old:
+            return z
+
+
+def _tau(x):
+    """改进估计中取到最大值的寄存器比例的修正项"""
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y, z = 1.0, 1.0 - x
+    while True:
+        x = math.sqrt(x)
+        z_old = z
+        y *= 0.5
+        z -= (1.0 - x) ** 2 * y
+        if z == z_old:
+            return z / 3
+
+
+def merge_all(sketches, empty):
+    """把一组同类草图合并成一个新草图（不修改原草图）；列表为空时返回 empty() 创建的空草图"""
+    sketches = list(sketches)
+    if not sketches:
+        return empty()
+    merged = copy.deepcopy(sketches[0])
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    return merged
@@ -1,9 +1,33 @@
 #第9章/streamlit_predict_v2.py
+import os
+
 import streamlit as st
-import pickle
-import pandas as pd
+from feature_encoding import encoder_for
+from forest_quantiles import predict_with_quantiles
+from insurance_model import CATEGORICAL_COLUMNS, MODEL_PATH  #模型文件和one-hot编码的原始列（与预测服务等共用）
+from model_registry import load_artifact, artifact_info
+from packed_forest import preferred_model_path
+from instrumentation import finish_rerun, mark_section, start_rerun, stop_rerun, timed_section
+from prediction_cache import cached_predict, prediction_cache
+
+def load_model():
+    """通过进程级模型注册表加载回归模型，返回 (模型, 加载信息, 是否已预热, 错误信息)
+
+    每个进程只反序列化一次，之后的重跑直接命中缓存；模型文件被替换时自动重新加载。
+    """
+    try:
+        model_path = preferred_model_path(MODEL_PATH)
+        before = artifact_info(model_path)
+        model = load_artifact(model_path)
+    except FileNotFoundError:
+        return None, None, False, f'未找到模型文件：{MODEL_PATH}'
+    except Exception as e:
+        return None, None, False, f'模型加载失败：{e}'
+    info = artifact_info(model_path)
+    #注册表中的加载信息未被替换，说明本次直接复用了进程内已加载的模型
+    return model, info, info is before, None
 
-def introduce_page():
+def introduce_page(model_info, model_warm, model_error):
     """当选择简介页面时，将呈现该函数的内容"""
     st.write("# 欢迎使用！")
     st.sidebar.success("单击 ➡️ 预测医疗费用")
@@ -25,7 +49,19 @@ def introduce_page():
         """
     )
 
-def predict_page():
+    #展示模型的加载状态，便于排查预测延迟
+    st.markdown("## 模型状态")
+    if model_error:
+        st.error(model_error)
+    else:
+        state = "已预热（复用进程内缓存）" if model_warm else "冷启动（本次重跑中加载）"
+        st.write(f"- 模型文件：{os.path.basename(model_info.path)}（版本 {model_info.sha256[:12]}）")
+        st.write(f"- 缓存状态：{state}")
+        st.write(f"- 加载耗时：{model_info.load_seconds * 1000:.1f} 毫秒")
+        stats = prediction_cache('insurance').stats()
+        st.write(f"- 预测结果缓存：命中 {stats['hits']} 次，未命中 {stats['misses']} 次")
+
+def predict_page(rfr_model, model_info, model_error):
     """当选择预测费用页面时，将呈现该函数的内容"""
     st.markdown(
         """
@@ -36,6 +72,11 @@ def predict_page():
         """
     )
 
+    #模型不可用时直接提示，避免用户填完表单后才发现无法预测
+    if model_error:
+        st.error(f"{model_error}，暂时无法进行预测，请联系技术支持。")
+        stop_rerun()
+
     #运用表单和表单提交按钮
     with st.form('user_inputs'):
         age = st.number_input('年龄', min_value=0)
@@ -47,50 +88,24 @@ def predict_page():
         submitted = st.form_submit_button('预测费用')
         
         if submitted:
-            format_data = [age, sex, bmi, children, smoke, region]
-
-            #初始化数据预处理格式中与性别相关的变量
-            sex_female, sex_male = 0, 0
-            #根据用户输入的性别数据更改对应的值
-            if sex == '女性':
-                sex_female = 1
-            elif sex == '男性':
-                sex_male = 1
-
-            smoke_yes, smoke_no = 0, 0
-            #根据用户输入的吸烟数据更改对应的值
-            if smoke == '是':
-                smoke_yes = 1
-            elif smoke == '否':
-                smoke_no = 1
-
-            region_northeast, region_southeast, region_northwest, region_southwest = 0, 0, 0, 0
-            #根据用户输入的区域数据更改对应的值
-            if region == '东北部':
-                region_northeast = 1
-            elif region == '东南部':
-                region_southeast = 1
-            elif region == '西北部':
-                region_northwest = 1
-            elif region == '西南部':
-                region_southwest = 1
-
-            format_data = [age, bmi, children, sex_female, sex_male,
-                           smoke_no, smoke_yes,
-                           region_northeast, region_southeast, region_northwest, region_southwest]
+            #整理为原始记录（列名与训练数据集一致），由编码器完成one-hot编码
+            record = {'年龄': age, 'BMI': bmi, '子女数量': children,
+                      '性别': sex, '是否吸烟': smoke, '区域': region}
             
-            #使用pickle的load方法从磁盘文件反序列化加载一个之前保存的随机森林回归模型
-            with open('rfr_model.pkl', 'rb') as f:
-                rfr_model = pickle.load(f)
-
-            #将格式化数据转为DataFrame，匹配模型的特征名
-            format_data_df = pd.DataFrame(data=[format_data], columns=rfr_model.feature_names_in_)
+            #按模型的feature_names_in_将记录编码为特征数组（列顺序与训练时一致）
+            format_data = encoder_for(rfr_model, CATEGORICAL_COLUMNS).encode_record(record)
             
-            #使用模型对格式化后的数据进行预测，返回预测的医疗费用
-            predict_result = rfr_model.predict(format_data_df)[0]
+            #一次性取得森林中每棵树的预测值：均值即模型的预测医疗费用，分位数反映费用的波动区间
+            #结果以模型版本和特征向量为键缓存，重复提交相同信息时直接返回
+            with timed_section('预测'):
+                predict_result, (p10, p50, p90) = cached_predict(
+                    'insurance', model_info.sha256, format_data,
+                    lambda X: zip(*predict_with_quantiles(rfr_model, X))
+                )[0]
             
             #输出预测结果，保留两位小数
             st.write('根据您输入的数据，预测该客户的医疗费用是：', round(predict_result, 2))
+            st.write(f'费用区间（各决策树预测值的分位数）：P10 {p10:.2f}，P50 {p50:.2f}，P90 {p90:.2f}')
             st.write("技术支持:email: support@example.com")
 
 #设置页面的标题、图标
@@ -99,10 +114,23 @@ st.set_page_config(
     page_icon="💰",
 )
 
+#按需开启重跑性能分析（环境变量 APP_PROFILE=1 或地址加 ?profile=1），以下各段分别计时
+start_rerun('streamlit_predict_v2')
+
+#启动时检查并加载模型：加载失败时在侧边栏立即提示，而不是等到提交表单时才报错
+mark_section('模型加载')
+rfr_model, model_info, model_warm, model_error = load_model()
+if model_error:
+    st.sidebar.error(model_error)
+
 #在左侧添加侧边栏并设置单选按钮
 nav = st.sidebar.radio("导航", ["简介", "预测医疗费用"])
 #根据选择的结果，展示不同的页面
 if nav == "简介":
-    introduce_page()
+    mark_section('页面：简介')
+    introduce_page(model_info, model_warm, model_error)
 else:
-    predict_page()
+    mark_section('页面：预测医疗费用')
+    predict_page(rfr_model, model_info, model_error)
+
+finish_rerun()
@@ -1,12 +1,22 @@
 # 导入所需库
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime
-import os  # 用于路径校验和容错
+from lazy_imports import lazy_module
+from instrumentation import finish_rerun, mark_section, start_rerun, stop_rerun, timed_section
+from prediction_cache import cached_predict, prediction_cache
+from image_assets import FULL_WIDTH, image_bytes, preload_images
+from chart_data import box_figure, box_summaries_for, box_summary_from_sketch, histogram_figure
+from student_data import COLUMNS, MissingColumnsError, load_student_data
+from student_batch import AT_RISK_TIER, MISSING_TIER, TIER_COLUMN, iter_scored_chunks, score_frame, tier_counts, to_csv_bytes
+from student_model import score_model_for
+from student_stats import major_stats_for
+from student_stream import STREAMING_THRESHOLD_BYTES, load_major_stats, should_stream
+
+# Plotly 只有“专业数据分析”页面用到，延迟到第一次画图时再导入
+px = lazy_module("plotly.express")
+go = lazy_module("plotly.graph_objects")
 
 # ---------------------- 全局配置：仅保留基础页面设置 ----------------------
 st.set_page_config(
@@ -14,18 +24,11 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+# 按需开启重跑性能分析（环境变量 APP_PROFILE=1 或地址加 ?profile=1），以下各段分别计时
+start_rerun("student")
+mark_section("图片预加载")
 
-# ---------------------- 全局变量：统一列名定义 ----------------------
-COLUMNS = {
-    "major": "专业",
-    "gender": "性别",
-    "midterm": "期中考试分数",
-    "final": "期末考试分数",
-    "study_hour": "每周学习时长（小时）",
-    "attendance": "上课出勤率",
-    "student_id": "学号"
-}
-
+# ---------------------- 全局变量：统一列名定义见 student_data.COLUMNS ----------------------
 # 匹配截图中的photo文件夹路径（需将photo文件夹上传到GitHub仓库根目录）
 LOCAL_IMAGES = {
     "preview": "photo/功能预览图.png",
@@ -33,39 +36,63 @@ LOCAL_IMAGES = {
     "good": "photo/继续努力.jpg",
     "poor": "photo/要加强学习.jpg"
 }
+# 启动时按显示宽度预先生成图片（功能预览图按容器宽度显示，鼓励图片宽 300 像素），缺失的图片在显示时提示
+preload_images([(LOCAL_IMAGES["preview"], FULL_WIDTH)] + [(LOCAL_IMAGES[k], 300) for k in ("excellent", "good", "poor")])
 
 # ---------------------- 1. 数据加载函数 ----------------------
-@st.cache_data
-def load_local_data():
-    """加载本地学生数据CSV文件，并处理异常情况"""
-    csv_path = "student_data_adjusted_rounded.csv"
+CSV_PATH = "student_data_adjusted_rounded.csv"
+
+def load_or_stop(loader):
+    """调用 loader(CSV路径) 读取本地学生数据，出错时在页面上提示并停止运行"""
     try:
-        df = pd.read_csv(csv_path)
-        missing_cols = [col for col in COLUMNS.values() if col not in df.columns]
-        if missing_cols:
-            st.error(f"❌ CSV缺少必要列：{missing_cols}")
-            st.stop()
-        return df
+        return loader(CSV_PATH)
+    except MissingColumnsError as e:
+        st.error(f"❌ CSV缺少必要列：{e.missing}")
+        stop_rerun()
     except FileNotFoundError:
-        st.error(f"❌ 未找到CSV文件：{csv_path}")
-        st.stop()
+        st.error(f"❌ 未找到CSV文件：{CSV_PATH}")
+        stop_rerun()
     except Exception as e:
         st.error(f"❌ 数据加载失败：{str(e)}")
-        st.stop()
+        stop_rerun()
+
+def load_local_data():
+    """加载本地学生数据CSV文件，并处理异常情况
+
+    数据以紧凑类型加载并在进程内共享同一份只读 DataFrame（不再像 st.cache_data 那样每次重跑都复制一份），
+    CSV 解析结果保存为 Feather 快照，冷启动时直接内存映射读取。
+    CSV 末尾追加新记录后，下次运行只解析新增的行并增量更新各专业统计。
+    超过 STREAMING_THRESHOLD_BYTES 的大文件不整表加载，返回 None，由 load_major_stats 分块流式统计。
+    """
+    return load_or_stop(lambda path: None if should_stream(path) else load_student_data(path))
 
+mark_section("数据加载")
 df = load_local_data()
+# 流式模式下没有原始数据，只有各专业统计：需要逐条数据的预测页面不提供
+streaming = df is None
+# 各专业统计汇总：数据加载后只计算一次，所有页面共用
+mark_section("分组统计")
+major_stats = load_or_stop(load_major_stats) if streaming else major_stats_for(df)
+major_summary = major_stats.table()
+# 期末成绩预测模型：按CSV内容哈希缓存系数，数据不变时不会重新拟合
+mark_section("模型加载")
+score_model = None if streaming else score_model_for(df, CSV_PATH)
 
 # ---------------------- 2. 侧边栏导航 ----------------------
+mark_section("侧边栏导航")
 st.sidebar.title("🎯 导航菜单")
 page = st.sidebar.radio(
     "选择功能页面",
-    ["项目概述", "专业数据分析", "成绩预测"],
+    ["项目概述", "专业数据分析"] + ([] if streaming else ["成绩预测", "批量预测"]),
     index=0,
     key="main_nav"
 )
+if streaming:
+    st.sidebar.info(f"数据文件超过 {STREAMING_THRESHOLD_BYTES // 1024 ** 2} MB，已按分块流式统计，仅提供概述和专业数据分析页面")
 
 # ---------------------- 3. 页面1：项目概述 ----------------------
 if page == "项目概述":
+    mark_section("页面：项目概述")
     st.title("📚 学生成绩分析与预测系统")
     st.markdown("---")
 
@@ -74,7 +101,7 @@ if page == "项目概述":
     with col_left:
         st.subheader("📋 项目概述")
         st.write(f"""
-        本系统基于 {len(df)} 条真实学生数据构建，覆盖 {len(df[COLUMNS['major']].unique())} 个专业，
+        本系统基于 {major_stats.n_rows} 条真实学生数据构建，覆盖 {len(major_summary)} 个专业，
         整合「学习时长、出勤率、期中成绩」等核心指标，实现多维度数据分析与期末成绩智能预测。
         """)
         
@@ -86,9 +113,9 @@ if page == "项目概述":
     
     with col_right:
         st.subheader("📸 功能预览")
-        if os.path.exists(LOCAL_IMAGES["preview"]):
-            st.image(LOCAL_IMAGES["preview"], use_container_width=True)
-        else:
+        try:
+            st.image(image_bytes(LOCAL_IMAGES["preview"]), use_container_width=True)
+        except FileNotFoundError:
             st.warning(f"⚠️ 功能预览图缺失：{LOCAL_IMAGES['preview']}")
 
     st.markdown("---")
@@ -115,7 +142,7 @@ if page == "项目概述":
         ("前端框架", "Streamlit\n快速构建Web界面"),
         ("数据处理", "Pandas + NumPy\n数据清洗与计算"),
         ("可视化", "Plotly\n交互式图表展示"),
-        ("预测模型", "Scikit-Learn\n线性回归预测")
+        ("预测模型", "NumPy 最小二乘\n线性回归预测")
     ]
     for idx, (title, desc) in enumerate(tech_info):
         with tech_cols[idx]:
@@ -124,14 +151,14 @@ if page == "项目概述":
 
 # ---------------------- 4. 页面2：专业数据分析 ----------------------
 elif page == "专业数据分析":
+    mark_section("页面：专业数据分析")
     st.title("📊 专业数据分析")
-    st.markdown(f"*基于 {len(df)} 条数据计算 | 更新时间：{datetime.now().strftime('%Y-%m-%d %H:%M')}*")
+    st.markdown(f"*基于 {major_stats.n_rows} 条数据计算 | 更新时间：{datetime.now().strftime('%Y-%m-%d %H:%M')}*")
     st.markdown("---")
 
     st.subheader("1. 👥 各专业性别分布")
     gender_cols = st.columns([2, 1])
-    gender_count = df.groupby([COLUMNS['major'], COLUMNS['gender']]).size().unstack(fill_value=0)
-    gender_ratio = gender_count.div(gender_count.sum(axis=1), axis=0).round(4)
+    gender_ratio = major_summary[["男", "女"]].div(major_summary["样本数量"], axis=0).round(4)
     
     with gender_cols[0]:
         fig_gender = go.Figure()
@@ -151,10 +178,9 @@ elif page == "专业数据分析":
 
     st.subheader("2. 📈 各专业核心学习指标")
     study_cols = st.columns([2, 1])
-    study_metrics = df.groupby(COLUMNS['major']).agg({
-        COLUMNS['midterm']: "mean", COLUMNS['final']: "mean",
-        COLUMNS['study_hour']: "mean", COLUMNS['attendance']: "mean"
-    }).round(2).reset_index()
+    study_metrics = major_summary[[
+        COLUMNS['midterm'], COLUMNS['final'], COLUMNS['study_hour'], COLUMNS['attendance']
+    ]].round(2).reset_index()
     
     with study_cols[0]:
         fig_study = go.Figure()
@@ -177,7 +203,7 @@ elif page == "专业数据分析":
 
     st.subheader("3. 🕒 各专业上课出勤率")
     attendance_cols = st.columns([2, 1])
-    attendance_metrics = df.groupby(COLUMNS['major']).agg({COLUMNS['attendance']: ["mean", "count"]}).round(4).reset_index()
+    attendance_metrics = major_summary[[COLUMNS['attendance'], "样本数量"]].round(4).reset_index()
     attendance_metrics.columns = [COLUMNS['major'], "平均上课出勤率", "样本数量"]
     
     with attendance_cols[0]:
@@ -198,43 +224,75 @@ elif page == "专业数据分析":
     st.markdown("---")
 
     st.subheader("4. 🔍 目标专业深度分析")
+    major_options = major_summary.index.tolist()
     target_major = st.selectbox(
         "选择要分析的专业",
-        options=df[COLUMNS['major']].unique(),
-        index=df[COLUMNS['major']].unique().tolist().index("大数据管理") if "大数据管理" in df[COLUMNS['major']].unique() else 0,
+        options=major_options,
+        index=major_options.index("大数据管理") if "大数据管理" in major_options else 0,
         key="target_major"
     )
-    major_data = df[df[COLUMNS['major']] == target_major].copy()
+    major_row = major_summary.loc[target_major]
     
     st.markdown("#### 📊 核心指标概览")
     metric_cols = st.columns(4)
     with metric_cols[0]:
-        st.metric("平均上课出勤率", f"{(major_data[COLUMNS['attendance']].mean() * 100).round(1)}%")
+        st.metric("平均上课出勤率", f"{major_row[COLUMNS['attendance']] * 100:.1f}%")
     with metric_cols[1]:
-        st.metric("平均期末分数", f"{major_data[COLUMNS['final']].mean().round(1)} 分")
+        st.metric("平均期末分数", f"{major_row[COLUMNS['final']]:.1f} 分")
     with metric_cols[2]:
-        pass_rate = (major_data[COLUMNS['final']] >= 60).sum() / len(major_data) * 100
-        st.metric("期末通过率", f"{pass_rate.round(1)}%")
+        st.metric("期末通过率", f"{major_row['通过率'] * 100:.1f}%")
     with metric_cols[3]:
-        st.metric("平均学习时长", f"{major_data[COLUMNS['study_hour']].mean().round(1)} 小时/周")
+        st.metric("平均学习时长", f"{major_row[COLUMNS['study_hour']]:.1f} 小时/周")
     
     st.markdown("#### 📉 数据分布详情")
     dist_cols = st.columns(2)
     with dist_cols[0]:
-        fig_score = px.histogram(major_data, x=COLUMNS['final'], nbins=15, color_discrete_sequence=["#4A90E2"], template="plotly_white", title=f"{target_major} - 期末分数分布")
+        # 图表只接收服务端预先算好的汇总数据，传给浏览器的数据量与专业人数无关
+        score_counts, score_edges = major_stats.histogram("final", target_major)
+        fig_score = histogram_figure(score_counts, score_edges, "#4A90E2", f"{target_major} - 期末分数分布", COLUMNS['final'])
         fig_score.update_layout(height=300)
         st.plotly_chart(fig_score, use_container_width=True)
     
     with dist_cols[1]:
-        fig_hour = px.box(major_data, y=COLUMNS['study_hour'], color_discrete_sequence=["#2D5B99"], template="plotly_white", title=f"{target_major} - 学习时长分布")
+        if streaming:
+            # 没有原始数据时由该专业的分位数草图近似计算四分位数
+            hour_box = box_summary_from_sketch(major_stats.sketch("study_hour", [target_major]), major_row[COLUMNS['study_hour']])
+        else:
+            hour_box = box_summaries_for(df, COLUMNS['major'], COLUMNS['study_hour'])[target_major]
+        fig_hour = box_figure(hour_box, "#2D5B99", f"{target_major} - 学习时长分布", COLUMNS['study_hour'])
         fig_hour.update_layout(height=300)
         st.plotly_chart(fig_hour, use_container_width=True)
 
+    st.markdown("---")
+
+    st.subheader("5. 🧮 多专业组合统计")
+    combo_majors = st.multiselect("选择专业（可多选）", options=major_options, default=major_options, key="combo_majors")
+    if combo_majors:
+        # 合并所选专业的分位数草图和去重计数器，不再对原始数据排序
+        final_sketch = major_stats.sketch("final", combo_majors)
+        hour_sketch = major_stats.sketch("study_hour", combo_majors)
+        final_q1, final_median, final_q3 = final_sketch.quantiles([0.25, 0.5, 0.75])
+        combo_cols = st.columns(3)
+        with combo_cols[0]:
+            st.metric("期末分数中位数", f"{final_median:.1f} 分", help=f"四分位数 {final_q1:.1f} ~ {final_q3:.1f} 分")
+        with combo_cols[1]:
+            st.metric("学习时长中位数", f"{hour_sketch.quantiles([0.5])[0]:.1f} 小时/周")
+        with combo_cols[2]:
+            st.metric("去重学生数（近似）", f"{major_stats.distinct_students(combo_majors)} 人")
+        st.caption(f"以上为近似统计：分位数的排名误差约 ±{final_sketch.rank_error * 100:.1f}%，"
+                   f"去重学生数的相对标准误差约 ±{major_stats.student_ids[0].error * 100:.1f}%")
+    else:
+        st.info("请至少选择一个专业")
+
 # ---------------------- 5. 页面3：成绩预测 ----------------------
-else:
+elif page == "成绩预测":
+    mark_section("页面：成绩预测")
     st.title("🔮 期末成绩预测")
     st.markdown("---")
     st.markdown("请输入学生的学习信息，系统将基于历史数据预测期末成绩并提供个性化建议")
+    cache_stats = prediction_cache("student").stats()
+    st.caption(f"预测模型基于 {score_model.n_samples} 条历史数据拟合，R² = {score_model.r2:.3f}；"
+               f"预测结果缓存命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次")
 
     with st.form(key="prediction_form", clear_on_submit=False):
         # 第一行分栏
@@ -257,9 +315,9 @@ else:
         with col4:
             pred_attendance = st.slider(
                 COLUMNS['attendance'],
-                min_value=round(df[COLUMNS['attendance']].min(), 2),
-                max_value=round(df[COLUMNS['attendance']].max(), 2),
-                value=round(df[COLUMNS['attendance']].mean(), 2),
+                min_value=round(float(df[COLUMNS['attendance']].min()), 2),
+                max_value=round(float(df[COLUMNS['attendance']].max()), 2),
+                value=round(float(df[COLUMNS['attendance']].mean()), 2),
                 step=0.01,
                 format="%.2f",
                 key="pred_attendance"
@@ -268,7 +326,7 @@ else:
         # 第三行分栏
         col5, col6 = st.columns(2)
         with col5:
-            pred_major = st.selectbox(COLUMNS['major'], df[COLUMNS['major']].unique(), key="pred_major")
+            pred_major = st.selectbox(COLUMNS['major'], major_summary.index.tolist(), key="pred_major")
         with col6:
             pred_midterm = st.slider(
                 COLUMNS['midterm'],
@@ -278,16 +336,33 @@ else:
                 key="pred_midterm"
             )
 
+        # 第四行分栏
+        col7, _ = st.columns(2)
+        with col7:
+            pred_homework = st.slider(
+                COLUMNS['homework'],
+                min_value=round(float(df[COLUMNS['homework']].min()), 2),
+                max_value=round(float(df[COLUMNS['homework']].max()), 2),
+                value=round(float(df[COLUMNS['homework']].mean()), 2),
+                step=0.01,
+                format="%.2f",
+                key="pred_homework"
+            )
+
         submit_btn = st.form_submit_button("🚀 预测期末成绩", type="primary", use_container_width=True)
 
     if submit_btn:
-        # 预测公式
-        predicted_final = (
-            0.65 * pred_midterm
-            + 18 * pred_attendance
-            + 0.15 * pred_study_hour
-            + 2.5
-        )
+        # 线性回归模型预测（专业、性别做 one-hot 编码后与各数值特征做一次点积），结果按模型版本和特征向量缓存
+        features = score_model.encoder.encode_record({
+            COLUMNS['midterm']: pred_midterm,
+            COLUMNS['attendance']: pred_attendance,
+            COLUMNS['study_hour']: pred_study_hour,
+            COLUMNS['homework']: pred_homework,
+            COLUMNS['major']: pred_major,
+            COLUMNS['gender']: pred_gender
+        })
+        with timed_section("预测"):
+            predicted_final = float(cached_predict("student", score_model.version, features, score_model.predict)[0])
         predicted_final = max(0, min(100, round(predicted_final, 1)))
 
         st.markdown("---")
@@ -302,9 +377,9 @@ else:
                 重点突破高阶知识点，进一步提升竞争力。
                 """)
                 st.markdown("#### 💖 专属鼓励")
-                if os.path.exists(LOCAL_IMAGES["excellent"]):
-                    st.image(LOCAL_IMAGES["excellent"], width=300)
-                else:
+                try:
+                    st.image(image_bytes(LOCAL_IMAGES["excellent"], 300), width=300)
+                except FileNotFoundError:
                     st.warning(f"⚠️ 鼓励图片缺失：{LOCAL_IMAGES['excellent']}")
                 st.markdown("很棒哦！继续保持🌟")
                 
@@ -315,9 +390,9 @@ else:
                 每周可增加2-3小时学习时长，有望冲击优秀等级。
                 """)
                 st.markdown("#### 💪 专属鼓励")
-                if os.path.exists(LOCAL_IMAGES["good"]):
-                    st.image(LOCAL_IMAGES["good"], width=300)
-                else:
+                try:
+                    st.image(image_bytes(LOCAL_IMAGES["good"], 300), width=300)
+                except FileNotFoundError:
                     st.warning(f"⚠️ 鼓励图片缺失：{LOCAL_IMAGES['good']}")
                 st.markdown("继续努力！优秀就在前方🚀")
                 
@@ -338,13 +413,56 @@ else:
                     4. 主动寻求老师一对一辅导。
                     """)
                 st.markdown("#### 📝 专属鼓励")
-                if os.path.exists(LOCAL_IMAGES["poor"]):
-                    st.image(LOCAL_IMAGES["poor"], width=300)
-                else:
+                try:
+                    st.image(image_bytes(LOCAL_IMAGES["poor"], 300), width=300)
+                except FileNotFoundError:
                     st.warning(f"⚠️ 鼓励图片缺失：{LOCAL_IMAGES['poor']}")
                 st.markdown("要加强学习啦！现在努力还不晚💡")
             
             st.markdown("#### 📈 参考数据")
-            ref_data = df[df[COLUMNS['major']] == pred_major]
-            st.write(f"- 同专业平均期末分数：{ref_data[COLUMNS['final']].mean().round(1)} 分")
-            st.write(f"- 同专业期末通过率：{((ref_data[COLUMNS['final']] >= 60).sum() / len(ref_data) * 100).round(1)}%")
\ No newline at end of file
+            ref_data = major_summary.loc[pred_major]
+            st.write(f"- 同专业平均期末分数：{ref_data[COLUMNS['final']]:.1f} 分")
+            st.write(f"- 同专业期末通过率：{ref_data['通过率'] * 100:.1f}%")
+
+# ---------------------- 6. 页面4：批量预测与风险筛查 ----------------------
+else:
+    mark_section("页面：批量预测")
+    st.title("📋 批量预测与风险筛查")
+    st.markdown("---")
+    st.markdown("一次性预测全部学生（或上传的学生名单）的期末成绩，按 优秀/良好/及格/不及格风险 分级，并导出风险名单")
+
+    source = st.radio("预测对象", ["全部历史数据", "上传学生名单"], horizontal=True, key="batch_source")
+    scored = None
+    if source == "全部历史数据":
+        with timed_section("批量预测"):
+            scored = score_frame(df, score_model)
+    else:
+        roster_file = st.file_uploader("上传学生名单CSV（列格式同 student_data_adjusted_rounded.csv，可不含期末成绩）", type=["csv"])
+        if roster_file is not None:
+            try:
+                with timed_section("批量预测"):
+                    scored = pd.concat(iter_scored_chunks(roster_file, score_model), ignore_index=True)
+            except MissingColumnsError as e:
+                st.error(f"❌ 名单缺少必要列：{e.missing}")
+
+    if scored is not None:
+        counts = tier_counts(scored)
+        tier_cols = st.columns(len(counts))
+        for col, (tier, count) in zip(tier_cols, counts.items()):
+            with col:
+                st.metric(tier, f"{count} 人", f"{count / max(len(scored), 1) * 100:.1f}%", delta_color="off")
+        n_missing = int((scored[TIER_COLUMN] == MISSING_TIER).sum())
+        if n_missing:
+            st.caption(f"另有 {n_missing} 人的数值特征缺失，无法预测（等级记为“{MISSING_TIER}”），未计入以上各等级和风险名单")
+
+        at_risk = scored[scored[TIER_COLUMN] == AT_RISK_TIER]
+        st.markdown(f"#### ⚠️ 风险名单（共 {len(at_risk)} 人）")
+        st.dataframe(at_risk.head(200), use_container_width=True)
+
+        download_cols = st.columns(2)
+        with download_cols[0]:
+            st.download_button("📥 下载全部预测结果", to_csv_bytes(scored), file_name="批量预测结果.csv", mime="text/csv")
+        with download_cols[1]:
+            st.download_button("📥 下载风险名单", to_csv_bytes(at_risk), file_name="风险名单.csv", mime="text/csv")
+
+finish_rerun()
@@ -0,0 +1,95 @@
+# 学生成绩批量预测与风险筛查：整表一次性预测并分级，分块输出结果和风险名单
+import argparse
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+
+from student_data import CSV_PATH, DTYPES, MissingColumnsError, load_student_data
+from student_model import CATEGORICAL_FEATURES, NUMERIC_FEATURES, score_model_for
+
+CHUNK_SIZE = 100_000
+PREDICTION_COLUMN = "预测期末成绩"
+TIER_COLUMN = "预测等级"
+AT_RISK_TIER = "不及格风险"
+MISSING_TIER = "数据缺失"  # 数值特征有缺失、无法预测的行：不计入各等级人数，也不进入风险名单
+
+# 等级划分（与成绩预测页面一致）：从高到低依次判断，都不满足时为“不及格风险”
+GRADE_TIERS = [(85, "优秀"), (70, "良好"), (60, "及格")]
+TIER_ORDER = [tier for _, tier in GRADE_TIERS] + [AT_RISK_TIER]
+
+
+def grade_tiers(predicted):
+    """把预测分数数组映射为等级数组；预测值为 NaN（数值特征缺失）的行记为“数据缺失”"""
+    tiers = np.select([predicted >= score for score, _ in GRADE_TIERS],
+                      [tier for _, tier in GRADE_TIERS], default=AT_RISK_TIER)
+    return np.where(np.isfinite(predicted), tiers, MISSING_TIER)
+
+
+def score_frame(df, model):
+    """对整张表一次性预测，返回追加了预测成绩与等级列的新表"""
+    missing = [col for col in NUMERIC_FEATURES + list(CATEGORICAL_FEATURES) if col not in df.columns]
+    if missing:
+        raise MissingColumnsError(missing)
+    predicted = np.clip(np.round(model.predict_frame(df), 1), 0, 100)
+    return df.assign(**{PREDICTION_COLUMN: predicted, TIER_COLUMN: grade_tiers(predicted)})
+
+
+def iter_scored_chunks(source, model, chunksize=CHUNK_SIZE):
+    """逐块读取名单CSV（路径或文件对象）并预测，逐块产出结果"""
+    header = pd.read_csv(source, nrows=0).columns
+    if hasattr(source, "seek"):
+        source.seek(0)
+    dtype = {col: dt for col, dt in DTYPES.items() if col in header}
+    for chunk in pd.read_csv(source, dtype=dtype, chunksize=chunksize):
+        yield score_frame(chunk, model)
+
+
+def tier_counts(scored):
+    """各等级人数（按等级从高到低排列，不含“数据缺失”的行）"""
+    return scored[TIER_COLUMN].value_counts().reindex(TIER_ORDER, fill_value=0)
+
+
+def write_chunks(chunks, out, at_risk_out=None):
+    """把结果分块写出，同时可把风险名单写到另一个输出；返回各等级人数（最后一项为“数据缺失”的行数）"""
+    counts = pd.Series(0, index=TIER_ORDER + [MISSING_TIER])
+    for idx, scored in enumerate(chunks):
+        scored.to_csv(out, index=False, header=(idx == 0))
+        if at_risk_out is not None:
+            scored[scored[TIER_COLUMN] == AT_RISK_TIER].to_csv(at_risk_out, index=False, header=(idx == 0))
+        counts += scored[TIER_COLUMN].value_counts().reindex(counts.index, fill_value=0)
+    return counts
+
+
+def to_csv_bytes(df):
+    """导出为带BOM的UTF-8 CSV，便于直接用Excel打开"""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+def main(argv=None):
+    """命令行入口：python student_batch.py [名单.csv] -o 结果.csv --at-risk 风险名单.csv"""
+    parser = argparse.ArgumentParser(description="学生期末成绩批量预测与风险筛查")
+    parser.add_argument("roster", nargs="?", default=CSV_PATH, help="待预测的学生名单CSV，默认使用全部历史数据")
+    parser.add_argument("-o", "--output", help="预测结果CSV路径，不指定则输出到标准输出")
+    parser.add_argument("--at-risk", help="风险名单（预测等级为“不及格风险”）CSV路径")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="每块预测的行数")
+    args = parser.parse_args(argv)
+
+    model = score_model_for(load_student_data(CSV_PATH), CSV_PATH)
+    out = open(args.output, "w", encoding="utf-8-sig", newline="") if args.output else sys.stdout
+    at_risk_out = open(args.at_risk, "w", encoding="utf-8-sig", newline="") if args.at_risk else None
+    try:
+        counts = write_chunks(iter_scored_chunks(args.roster, model, args.chunksize), out, at_risk_out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if at_risk_out is not None:
+            at_risk_out.close()
+    print("，".join(f"{tier} {count} 人" for tier, count in counts.items()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
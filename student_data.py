@@ -0,0 +1,184 @@
+# 学生数据加载层：按紧凑类型解析CSV，保存Feather快照，之后以内存映射方式零拷贝读取，并在进程内共享只读数据；
+# CSV 只在末尾追加记录时，只解析新增部分并增量更新已加载的数据和统计
+import hashlib
+import io
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from pandas.api.types import union_categoricals
+
+from feature_encoding import MissingColumnsError
+from frame_cache import carry_derived
+from model_registry import file_signature
+
+CSV_PATH = "student_data_adjusted_rounded.csv"
+CACHE_DIR = ".cache"
+
+# 统一列名定义
+COLUMNS = {
+    "major": "专业",
+    "gender": "性别",
+    "midterm": "期中考试分数",
+    "final": "期末考试分数",
+    "study_hour": "每周学习时长（小时）",
+    "attendance": "上课出勤率",
+    "homework": "作业完成率",
+    "student_id": "学号"
+}
+
+# 各列的紧凑类型：学号为10位整数（uint32 足够），专业/性别为分类类型，分数和比率用 float32
+DTYPES = {
+    "学号": "uint32",
+    "性别": "category",
+    "专业": "category",
+    "每周学习时长（小时）": "float32",
+    "上课出勤率": "float32",
+    "期中考试分数": "float32",
+    "作业完成率": "float32",
+    "期末考试分数": "float32",
+}
+
+# Feather元数据中记录源CSV文件签名的键
+_SIGNATURE_KEY = b"source_signature"
+
+# 判断是否为追加写入时，比对上次已读取部分末尾这么多字节的摘要
+_TAIL_CHECK_BYTES = 4096
+
+_lock = threading.Lock()
+_cache = {}  # CSV绝对路径 -> _LoadedCsv（进程内缓存，所有会话共享同一份只读数据）
+
+
+@dataclass
+class _LoadedCsv:
+    """已加载的CSV状态：记录读到的字节偏移和末尾摘要，用于识别追加写入"""
+    signature: tuple
+    offset: int        # 已解析到的字节偏移（总是落在行尾之后）
+    tail_digest: str   # offset 之前 _TAIL_CHECK_BYTES 字节的摘要
+    df: pd.DataFrame
+
+
+def parse_csv(csv_path=CSV_PATH):
+    """按紧凑类型解析CSV，并校验必需列"""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    missing = [col for col in COLUMNS.values() if col not in header]
+    if missing:
+        raise MissingColumnsError(missing)
+    return pd.read_csv(csv_path, dtype={col: dtype for col, dtype in DTYPES.items() if col in header})
+
+
+def snapshot_path(csv_path):
+    """CSV对应的Feather快照路径"""
+    return os.path.join(CACHE_DIR, os.path.splitext(os.path.basename(csv_path))[0] + ".feather")
+
+
+def _read_snapshot(path, signature):
+    """读取Feather快照：源文件签名一致时以内存映射方式读取，否则返回 None
+
+    快照不压缩，数值列可以直接引用内存映射的缓冲区（零拷贝、只读）。
+    """
+    try:
+        table = feather.read_table(path, memory_map=True)
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    if (table.schema.metadata or {}).get(_SIGNATURE_KEY) != repr(signature).encode():
+        return None
+    return table.to_pandas(split_blocks=True)
+
+
+def _write_snapshot(df, path, signature):
+    """写入Feather快照（先写临时文件再替换，避免多个进程读到写了一半的文件）"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _SIGNATURE_KEY: repr(signature).encode()})
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def _tail_digest(f, offset):
+    """offset 之前一小段内容的摘要：文件被改写（而非追加）时该段内容通常会变化"""
+    start = max(offset - _TAIL_CHECK_BYTES, 0)
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def _read_appended(csv_path, loaded):
+    """读取上次偏移之后追加的完整行，返回 (新增数据, 新偏移)；文件不是单纯追加时返回 None"""
+    with open(csv_path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size < loaded.offset or _tail_digest(f, loaded.offset) != loaded.tail_digest:
+            return None
+        f.seek(loaded.offset)
+        data = f.read()
+    # 只解析到最后一个换行符，写了一半的行留到下次再读
+    data = data[:data.rfind(b"\n") + 1]
+    columns = loaded.df.columns
+    tail = pd.read_csv(io.BytesIO(data), header=None, names=columns,
+                       dtype={col: dtype for col, dtype in DTYPES.items() if col in columns})
+    return tail, loaded.offset + len(data)
+
+
+def _append_rows(df, tail):
+    """拼接新增行；分类列先合并类别，避免拼接后退化为 object 类型"""
+    columns = {}
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            columns[col] = union_categoricals([df[col].array, pd.Categorical(tail[col])])
+        else:
+            columns[col] = np.concatenate([df[col].to_numpy(), tail[col].to_numpy(dtype=df[col].dtype)])
+    return pd.DataFrame(columns)
+
+
+def _full_load(csv_path, signature):
+    """全量加载：优先读取快照，快照失效时解析整个CSV并重建快照"""
+    path = snapshot_path(csv_path)
+    df = _read_snapshot(path, signature)
+    if df is None:
+        _write_snapshot(parse_csv(csv_path), path, signature)
+        df = _read_snapshot(path, signature)
+    with open(csv_path, "rb") as f:
+        digest = _tail_digest(f, signature[1])
+    return _LoadedCsv(signature, signature[1], digest, df)
+
+
+def _incremental_load(csv_path, signature, loaded):
+    """增量加载：只解析追加的行，并把支持增量更新的派生统计迁移到新数据上；不是追加写入时返回 None"""
+    appended = _read_appended(csv_path, loaded)
+    if appended is None:
+        return None
+    tail, offset = appended
+    if tail.empty:
+        return _LoadedCsv(signature, offset, loaded.tail_digest, loaded.df)
+    df = _append_rows(loaded.df, tail)
+    if offset == signature[1]:
+        # 刷新快照，之后启动的进程无需再解析整个CSV
+        _write_snapshot(df, snapshot_path(csv_path), signature)
+    carry_derived(loaded.df, df, tail)
+    with open(csv_path, "rb") as f:
+        digest = _tail_digest(f, offset)
+    return _LoadedCsv(signature, offset, digest, df)
+
+
+def load_student_data(csv_path=CSV_PATH):
+    """加载学生数据：同一进程内复用同一份只读 DataFrame
+
+    CSV修改时间或大小变化时，如果只是在末尾追加了记录，则只解析新增的行并增量更新
+    各专业统计；否则重新解析整个文件并重建快照。
+    返回的数据由所有会话共享，调用方如需修改请先 copy()。
+    """
+    key = os.path.abspath(csv_path)
+    signature = file_signature(csv_path)
+    loaded = _cache.get(key)
+    if loaded is not None and loaded.signature == signature:
+        return loaded.df
+    with _lock:
+        loaded = _cache.get(key)
+        if loaded is None or loaded.signature != signature:
+            refreshed = _incremental_load(csv_path, signature, loaded) if loaded is not None else None
+            _cache[key] = loaded = refreshed or _full_load(csv_path, signature)
+    return loaded.df
@@ -0,0 +1,108 @@
+# 期末成绩预测模型：用 NumPy 最小二乘一次拟合线性回归，系数按CSV内容哈希缓存到磁盘
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from feature_encoding import FeatureEncoder, encoder_for
+from frame_cache import derived_for
+from student_data import CACHE_DIR, COLUMNS
+
+# 参与拟合的数值特征与分类特征（分类特征做 one-hot 编码，并去掉第一个取值作为基准，避免与截距共线）
+NUMERIC_FEATURES = [COLUMNS["midterm"], COLUMNS["attendance"], COLUMNS["study_hour"], COLUMNS["homework"]]
+CATEGORICAL_FEATURES = (COLUMNS["major"], COLUMNS["gender"])
+TARGET = COLUMNS["final"]
+
+
+class LinearScoreModel:
+    """线性回归成绩模型：预测值 = 特征 · 系数 + 截距"""
+
+    def __init__(self, feature_names, coef, intercept, version, n_samples, r2, fit_seconds):
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)  # 与 scikit-learn 模型一致的特征名属性
+        self.coef_ = np.asarray(coef, dtype=np.float64)
+        self.intercept_ = float(intercept)
+        self.version = version          # 训练数据的内容哈希
+        self.n_samples = n_samples
+        self.r2 = r2
+        self.fit_seconds = fit_seconds
+
+    @property
+    def encoder(self):
+        return encoder_for(self, CATEGORICAL_FEATURES)
+
+    def predict(self, X):
+        """对编码后的特征矩阵做预测（单个学生为 1 行，批量为 N 行）"""
+        return X @ self.coef_ + self.intercept_
+
+    def predict_record(self, record):
+        """预测单个学生（原始列名 -> 取值）"""
+        return float(self.predict(self.encoder.encode_record(record))[0])
+
+    def predict_frame(self, df):
+        """一次性预测整张表中的所有学生"""
+        return self.predict(self.encoder.encode_frame(df))
+
+    def to_dict(self):
+        return {
+            "feature_names": self.feature_names_in_.tolist(), "coef": self.coef_.tolist(),
+            "intercept": self.intercept_, "version": self.version, "n_samples": self.n_samples,
+            "r2": self.r2, "fit_seconds": self.fit_seconds,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def fit_model(df, version):
+    """闭式最小二乘拟合：构造设计矩阵后调用一次 np.linalg.lstsq"""
+    start = time.perf_counter()
+    feature_names = list(NUMERIC_FEATURES)
+    for column in CATEGORICAL_FEATURES:
+        feature_names += [f"{column}_{value}" for value in sorted(df[column].dropna().unique())[1:]]
+    X = FeatureEncoder(feature_names, CATEGORICAL_FEATURES).encode_frame(df)
+    y = df[TARGET].to_numpy(dtype=np.float64)
+    design = np.hstack([X, np.ones((len(X), 1))])
+    solution, *_ = np.linalg.lstsq(design, y, rcond=None)
+    residual = y - design @ solution
+    r2 = 1.0 - float(residual @ residual) / float(((y - y.mean()) ** 2).sum())
+    return LinearScoreModel(feature_names, solution[:-1], solution[-1], version, len(y), r2,
+                            time.perf_counter() - start)
+
+
+def file_sha256(path):
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_cache_path(version):
+    return os.path.join(CACHE_DIR, f"student_model_{version[:16]}.json")
+
+
+def load_or_fit(df, csv_path):
+    """按CSV内容哈希读取磁盘上的系数缓存，没有缓存时拟合并写入"""
+    version = file_sha256(csv_path)
+    path = model_cache_path(version)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return LinearScoreModel.from_dict(json.load(f))
+    except (FileNotFoundError, ValueError, TypeError):
+        pass
+    model = fit_model(df, version)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(model.to_dict(), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return model
+
+
+def score_model_for(df, csv_path):
+    """获取数据对应的成绩模型：同一份已加载数据只读取/拟合一次"""
+    return derived_for(df, "score_model", lambda frame: load_or_fit(frame, csv_path))
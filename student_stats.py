@@ -0,0 +1,194 @@
+# 各专业统计汇总：一次扫描得到各专业的人数、性别分布、均值、通过人数、直方图和分位数/去重草图，所有页面共用
+import copy
+
+import numpy as np
+import pandas as pd
+
+from frame_cache import derived_for, register_incremental
+from parallel_agg import parallel_aggregate
+from sketches import HyperLogLog, KLLSketch, group_order, merge_all, split_by_group
+from student_data import COLUMNS
+
+PASS_SCORE = 60  # 期末及格线
+
+# 需要求均值的指标（内部键 -> 列名）
+MEAN_METRICS = ["midterm", "final", "study_hour", "attendance"]
+# 用分位数草图估计中位数、四分位数的指标
+SKETCH_METRICS = ["final", "study_hour"]
+# 统计用到的全部列（并行统计时只把这些列放入共享内存）
+STATS_COLUMNS = [COLUMNS["major"], COLUMNS["gender"], COLUMNS["student_id"]] + [COLUMNS[metric] for metric in MEAN_METRICS]
+
+# 直方图使用固定分箱，不同数据块的统计结果可以直接相加合并
+HISTOGRAM_BINS = {
+    "final": np.linspace(0, 100, 21),      # 期末分数：每5分一档
+    "study_hour": np.linspace(0, 40, 21),  # 每周学习时长：每2小时一档
+}
+
+
+def _bin_index(values, edges):
+    """计算每个值所在的分箱下标，超出范围的值归入首/尾分箱（与 np.histogram 一样右端点闭合）"""
+    idx = np.searchsorted(edges, values, side="right") - 1
+    return np.clip(idx, 0, len(edges) - 2)
+
+
+class MajorStats:
+    """可合并的各专业统计累加器：只保存计数和求和，均值、比例等在读取时再计算
+
+    update() 折叠一块数据，merge() 合并另一个累加器，因此同一套结构可用于
+    一次性全量统计、追加数据后的增量更新以及分块/并行统计。
+    """
+
+    def __init__(self):
+        self.majors = []    # 专业名称（行顺序）
+        self.genders = []   # 性别取值（列顺序）
+        self.count = np.zeros(0, dtype=np.int64)
+        self.gender_count = np.zeros((0, 0), dtype=np.int64)
+        self.sums = {metric: np.zeros(0) for metric in MEAN_METRICS}
+        self.sq_sums = {metric: np.zeros(0) for metric in MEAN_METRICS}  # 平方和，用于计算标准差
+        self.pass_count = np.zeros(0, dtype=np.int64)
+        self.histograms = {name: np.zeros((0, len(edges) - 1), dtype=np.int64)
+                           for name, edges in HISTOGRAM_BINS.items()}
+        self.sketches = {metric: [] for metric in SKETCH_METRICS}  # 每个专业一个 KLL 分位数草图
+        self.student_ids = []  # 每个专业一个 HyperLogLog，估计去重后的学生人数
+
+    def _align(self, majors, genders):
+        """扩充行/列以容纳新出现的专业和性别，返回它们在累加器中的下标"""
+        new_majors = [m for m in majors if m not in self.majors]
+        if new_majors:
+            grow = len(new_majors)
+            self.majors.extend(new_majors)
+            self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+            self.gender_count = np.vstack([self.gender_count, np.zeros((grow, len(self.genders)), dtype=np.int64)])
+            self.sums = {k: np.concatenate([v, np.zeros(grow)]) for k, v in self.sums.items()}
+            self.sq_sums = {k: np.concatenate([v, np.zeros(grow)]) for k, v in self.sq_sums.items()}
+            self.pass_count = np.concatenate([self.pass_count, np.zeros(grow, dtype=np.int64)])
+            self.histograms = {k: np.vstack([v, np.zeros((grow, v.shape[1]), dtype=np.int64)])
+                               for k, v in self.histograms.items()}
+            for sketches in self.sketches.values():
+                sketches.extend(KLLSketch() for _ in range(grow))
+            self.student_ids.extend(HyperLogLog() for _ in range(grow))
+        new_genders = [g for g in genders if g not in self.genders]
+        if new_genders:
+            self.genders.extend(new_genders)
+            self.gender_count = np.hstack([self.gender_count, np.zeros((len(self.majors), len(new_genders)), dtype=np.int64)])
+        major_pos = {m: i for i, m in enumerate(self.majors)}
+        gender_pos = {g: i for i, g in enumerate(self.genders)}
+        return (np.array([major_pos[m] for m in majors], dtype=np.intp),
+                np.array([gender_pos[g] for g in genders], dtype=np.intp))
+
+    def update(self, df):
+        """把一块数据折叠进累加器（每个统计量只做一次 bincount）"""
+        majors = pd.Categorical(df[COLUMNS["major"]])
+        genders = pd.Categorical(df[COLUMNS["gender"]])
+        major_map, gender_map = self._align(list(majors.categories), list(genders.categories))
+        valid = (majors.codes >= 0) & (genders.codes >= 0)
+        major_idx = major_map[majors.codes[valid]]
+        gender_idx = gender_map[genders.codes[valid]]
+        n_majors = len(self.majors)
+        order, bounds = group_order(major_idx, n_majors)
+
+        self.count += np.bincount(major_idx, minlength=n_majors)
+        self.gender_count += np.bincount(
+            major_idx * len(self.genders) + gender_idx, minlength=n_majors * len(self.genders)
+        ).reshape(n_majors, len(self.genders))
+        for metric in MEAN_METRICS:
+            values = df[COLUMNS[metric]].to_numpy(dtype=np.float64)[valid]
+            self.sums[metric] += np.bincount(major_idx, weights=values, minlength=n_majors)
+            self.sq_sums[metric] += np.bincount(major_idx, weights=values * values, minlength=n_majors)
+            if metric == "final":
+                self.pass_count += np.bincount(major_idx, weights=values >= PASS_SCORE, minlength=n_majors).astype(np.int64)
+            if metric in self.histograms:
+                edges = HISTOGRAM_BINS[metric]
+                n_bins = len(edges) - 1
+                self.histograms[metric] += np.bincount(
+                    major_idx * n_bins + _bin_index(values, edges), minlength=n_majors * n_bins
+                ).reshape(n_majors, n_bins)
+            if metric in self.sketches:
+                for pos, part in enumerate(split_by_group(values, order, bounds)):
+                    if len(part):
+                        self.sketches[metric][pos].update(part)
+        student_ids = df[COLUMNS["student_id"]].to_numpy()[valid]
+        for pos, part in enumerate(split_by_group(student_ids, order, bounds)):
+            if len(part):
+                self.student_ids[pos].update(part)
+        return self
+
+    def merge(self, other):
+        """把另一个累加器的结果合并进来"""
+        major_idx, gender_idx = self._align(other.majors, other.genders)
+        self.count[major_idx] += other.count
+        self.gender_count[np.ix_(major_idx, gender_idx)] += other.gender_count
+        for metric in MEAN_METRICS:
+            self.sums[metric][major_idx] += other.sums[metric]
+            self.sq_sums[metric][major_idx] += other.sq_sums[metric]
+        self.pass_count[major_idx] += other.pass_count
+        for name in self.histograms:
+            self.histograms[name][major_idx] += other.histograms[name]
+        for other_pos, pos in enumerate(major_idx):
+            for metric, sketches in self.sketches.items():
+                sketches[pos].merge(other.sketches[metric][other_pos])
+            self.student_ids[pos].merge(other.student_ids[other_pos])
+        return self
+
+    def copy(self):
+        """深拷贝（增量更新时不改动旧数据上已有的统计结果）"""
+        return copy.deepcopy(self)
+
+    @property
+    def n_rows(self):
+        return int(self.count.sum())
+
+    def std(self, metric):
+        """各专业某指标的总体标准差（由计数、和、平方和得到）"""
+        count = np.maximum(self.count, 1)
+        mean = self.sums[metric] / count
+        return np.sqrt(np.maximum(self.sq_sums[metric] / count - mean * mean, 0.0))
+
+    def table(self):
+        """各专业汇总表（按专业名排序），列包括样本数、各性别人数、各指标均值与标准差、去重学生数（近似）、通过人数和通过率"""
+        count = np.maximum(self.count, 1)
+        data = {"样本数量": self.count}
+        for pos, gender in enumerate(self.genders):
+            data[gender] = self.gender_count[:, pos]
+        for metric in MEAN_METRICS:
+            data[COLUMNS[metric]] = self.sums[metric] / count
+            data[f"{COLUMNS[metric]}标准差"] = self.std(metric)
+        # HyperLogLog 估计值可能略高于样本数，截断到样本数
+        data["去重学生数（近似）"] = np.minimum([ids.count() for ids in self.student_ids], self.count)
+        data["通过人数"] = self.pass_count
+        data["通过率"] = self.pass_count / count
+        table = pd.DataFrame(data, index=pd.Index(self.majors, name=COLUMNS["major"]))
+        return table[table["样本数量"] > 0].sort_index()
+
+    def histogram(self, name, major):
+        """返回某专业的直方图 (各分箱计数, 分箱边界)"""
+        return self.histograms[name][self.majors.index(major)], HISTOGRAM_BINS[name]
+
+    def sketch(self, metric, majors):
+        """若干专业合并后的分位数草图（任意专业组合都只需合并几个小草图）"""
+        return merge_all([self.sketches[metric][self.majors.index(major)] for major in majors], KLLSketch)
+
+    def distinct_students(self, majors):
+        """若干专业合并后的去重学生数（近似值，不超过这些专业的样本数）"""
+        positions = [self.majors.index(major) for major in majors]
+        estimate = merge_all([self.student_ids[pos] for pos in positions], HyperLogLog).count()
+        return min(estimate, int(self.count[positions].sum()))
+
+
+def fold_major_stats(df):
+    """把一块数据统计成一个新的累加器（并行统计时在工作进程中对每个分区调用）"""
+    return MajorStats().update(df)
+
+
+def build_major_stats(df):
+    """对整份数据做一次全量统计：数据量大时按行分区交给多个进程统计再合并"""
+    return parallel_aggregate(df, STATS_COLUMNS, fold_major_stats)
+
+
+def major_stats_for(df):
+    """获取（必要时构建）数据对应的各专业统计，同一个 DataFrame 对象只统计一次"""
+    return derived_for(df, "major_stats", build_major_stats)
+
+
+# 数据追加新记录时，只把新增部分折叠进已有统计，不再全量重算
+register_incremental("major_stats", lambda stats, delta: stats.copy().update(delta))
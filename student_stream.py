@@ -0,0 +1,100 @@
+# 学生数据流式统计：超出内存的大CSV按固定行数分块读取，每块折叠进可合并的各专业累加器，
+# 内存峰值只取决于块大小，与文件大小无关
+import os
+import pickle
+import threading
+from functools import partial
+
+import pandas as pd
+
+from model_registry import file_signature
+from parallel_agg import aggregate_files
+from student_data import CACHE_DIR, COLUMNS, DTYPES, MissingColumnsError
+from student_stats import MajorStats
+
+STREAM_CHUNK_ROWS = 200_000                # 每块读取的行数（8 列紧凑类型约 6 MB）
+STREAMING_THRESHOLD_BYTES = 512 * 1024 ** 2  # CSV 超过该大小时改为流式统计，不再整表加载
+
+# 专业数据分析页面用到的列（作业完成率不参与汇总，不必解析）
+STREAM_COLUMNS = [COLUMNS[key] for key in ("major", "gender", "student_id", "midterm", "final", "study_hour", "attendance")]
+# 持久化统计结果的格式版本：MajorStats 的结构变化时递增，旧文件随之失效
+_STATS_FORMAT = 3
+
+_lock = threading.Lock()
+_cache = {}  # CSV绝对路径 -> (文件签名, MajorStats)（进程内缓存，所有会话共享）
+
+
+def should_stream(csv_path):
+    """CSV 是否大到需要流式统计"""
+    return os.path.getsize(csv_path) > STREAMING_THRESHOLD_BYTES
+
+
+def iter_chunks(csv_path, chunksize=STREAM_CHUNK_ROWS):
+    """逐块读取CSV（只解析汇总需要的列），校验必需列后依次产出 DataFrame"""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    missing = [col for col in COLUMNS.values() if col not in header]
+    if missing:
+        raise MissingColumnsError(missing)
+    with pd.read_csv(csv_path, usecols=STREAM_COLUMNS, chunksize=chunksize,
+                     dtype={col: DTYPES[col] for col in STREAM_COLUMNS}) as reader:
+        yield from reader
+
+
+def stream_major_stats(csv_path, chunksize=STREAM_CHUNK_ROWS):
+    """一次扫描整个CSV，把每块数据折叠进同一个累加器"""
+    stats = MajorStats()
+    for chunk in iter_chunks(csv_path, chunksize):
+        stats.update(chunk)
+    return stats
+
+
+def stream_major_stats_files(csv_paths, chunksize=STREAM_CHUNK_ROWS, workers=None):
+    """多文件导出（同一表头的若干分片）：每个文件由一个工作进程独立流式统计，结果合并"""
+    return aggregate_files(csv_paths, partial(stream_major_stats, chunksize=chunksize), workers)
+
+
+def _stats_path(csv_path):
+    """流式统计结果的持久化路径"""
+    return os.path.join(CACHE_DIR, os.path.splitext(os.path.basename(csv_path))[0] + ".major_stats.pkl")
+
+
+def _read_stats(path, signature):
+    """读取持久化的统计结果：源文件签名一致时返回累加器，否则返回 None"""
+    try:
+        with open(path, "rb") as f:
+            saved = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+    return saved[2] if saved[:2] == (_STATS_FORMAT, signature) else None
+
+
+def _write_stats(stats, path, signature):
+    """持久化统计结果（先写临时文件再替换）"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump((_STATS_FORMAT, signature, stats), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_major_stats(csv_path, chunksize=STREAM_CHUNK_ROWS):
+    """获取大CSV的各专业统计：同一进程内复用，进程重启后读取 .cache 中的结果，文件变化时重新扫描
+
+    累加器只有几 KB，扫描一遍几十 GB 的文件则需要几分钟，因此结果按文件签名持久化。
+    返回的累加器由所有会话共享，不要修改。
+    """
+    key = os.path.abspath(csv_path)
+    signature = file_signature(csv_path)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with _lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != signature:
+            path = _stats_path(csv_path)
+            stats = _read_stats(path, signature)
+            if stats is None:
+                stats = stream_major_stats(csv_path, chunksize)
+                _write_stats(stats, path, signature)
+            _cache[key] = cached = (signature, stats)
+    return cached[1]
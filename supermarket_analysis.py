@@ -2,14 +2,21 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from bitmap_filter import bitmap_index_for
+from instrumentation import finish_rerun, mark_section, start_rerun
+from sales_cube import FILTER_DIMENSIONS, cube_for
+from sales_data import XLSX_PATH, load_sales_data
 
 # ---------------------- 1. 页面配置 ----------------------
 st.set_page_config(page_title="销售仪表板", layout="wide")
 st.title("销售仪表板")
+# 按需开启重跑性能分析（环境变量 APP_PROFILE=1 或地址加 ?profile=1），以下各段分别计时
+start_rerun("supermarket_analysis")
 
 
-# ---------------------- 2. 模拟销售数据 ----------------------
+# ---------------------- 2. 加载销售数据 ----------------------
 def generate_sample_data():
+    """生成模拟销售数据（仅在真实销售数据文件缺失时作为兜底）"""
     # 城市/顾客类型/性别/产品类型选项
     cities = ["太原", "临汾", "大同", "长治"]
     customer_types = ["会员用户", "普通用户"]
@@ -25,56 +32,74 @@ def generate_sample_data():
         "hour": np.random.randint(0, 24, 1000),  # 小时（0-23）
         "product_type": np.random.choice(product_types, 1000),
         "sales": np.random.randint(100, 1000, 1000),  # 单销售额
-        "rating": np.random.randint(5, 10, 1000)  # 评分（5-9）
+        "rating": np.random.randint(5, 10, 1000),  # 评分（5-9）
+        "order_id": [f"SIM-{i:04d}" for i in range(1000)]  # 订单号
     }
     df = pd.DataFrame(data)
     return df
 
-# 加载数据
-df = generate_sample_data()
+mark_section("数据加载")
+# 加载真实销售数据：Excel只解析一次并缓存为Parquet，之后的重跑直接复用进程内缓存
+try:
+    df = load_sales_data()
+except FileNotFoundError:
+    st.warning(f"未找到销售数据文件：{XLSX_PATH}，当前展示的是模拟数据")
+    df = generate_sample_data()
 
 
 # ---------------------- 3. 侧边栏：筛选控件 ----------------------
+mark_section("筛选控件")
 with st.sidebar:
     st.subheader("请筛选数据：")
     
     # 城市筛选
     selected_cities = st.multiselect(
         "请选择城市：",
-        options=df["city"].unique(),
+        options=df["city"].unique().tolist(),
         default=["太原", "临汾", "大同"]  # 默认选中示例中的城市
     )
     
     # 顾客类型筛选
     selected_types = st.multiselect(
         "请选择顾客类型：",
-        options=df["customer_type"].unique(),
-        default=df["customer_type"].unique()
+        options=df["customer_type"].unique().tolist(),
+        default=df["customer_type"].unique().tolist()
     )
     
     # 性别筛选
     selected_genders = st.multiselect(
         "请选择性别：",
-        options=df["gender"].unique(),
-        default=df["gender"].unique()
+        options=df["gender"].unique().tolist(),
+        default=df["gender"].unique().tolist()
     )
 
 
 # ---------------------- 4. 筛选数据 ----------------------
-df_filtered = df[
-    (df["city"].isin(selected_cities)) &
-    (df["customer_type"].isin(selected_types)) &
-    (df["gender"].isin(selected_genders))
-]
+mark_section("筛选数据")
+# 通过位图索引筛选：每个取值对应一个预先打包的位图，列内按位或、列间按位与，不再逐行比较字符串
+selections = {
+    "city": selected_cities,
+    "customer_type": selected_types,
+    "gender": selected_genders
+}
+row_index = bitmap_index_for(df, FILTER_DIMENSIONS).select(selections)
+df_filtered = df.take(row_index)
 
 
 # ---------------------- 5. 计算核心指标 ----------------------
-total_sales = df_filtered["sales"].sum()
-avg_rating = df_filtered["rating"].mean().round(1)
-avg_per_order = (total_sales / len(df_filtered)).round(2)
+mark_section("分组聚合")
+# 指标卡片和图表都从预聚合立方体切片得到，不再扫描原始行，耗时与数据行数无关
+cube_slice = cube_for(df).slice(selections)
+total_sales = cube_slice.total_sales
+avg_rating = round(cube_slice.avg_rating, 1)
+avg_per_order = round(cube_slice.avg_per_order, 2)
+# 每单销售额的分位数和去重订单数：合并所选单元格的小草图得到，不再对原始行排序
+order_q1, order_median, order_q3 = cube_slice.sales_quartiles()
+distinct_orders = cube_slice.distinct_orders
 
 
 # ---------------------- 6. 指标卡片展示 ----------------------
+mark_section("指标卡片")
 col1, col2, col3 = st.columns(3)
 with col1:
     st.write("总销售额：")
@@ -85,9 +110,22 @@ with col2:
 with col3:
     st.write("每单的平均销售额：")
     st.subheader(f"RMB¥{avg_per_order:,.2f}")
+col4, col5, col6 = st.columns(3)
+with col4:
+    st.write("每单销售额中位数：")
+    st.subheader(f"RMB¥{order_median:,.2f}")
+with col5:
+    st.write("每单销售额四分位区间：")
+    st.subheader(f"RMB¥{order_q1:,.0f} ~ {order_q3:,.0f}")
+with col6:
+    st.write("订单数（去重）：")
+    st.subheader(f"{distinct_orders:,} 单")
+st.caption(f"中位数、四分位数和去重订单数为近似统计（排名误差约 ±{cube_slice.sales_sketch.rank_error * 100:.1f}%，"
+           f"去重计数相对标准误差约 ±{cube_slice.order_ids.error * 100:.1f}%）")
 
 
 # ---------------------- 7. 图表展示（核心修改：添加马卡龙浅蓝颜色） ----------------------
+mark_section("图表构建")
 st.divider()  # 分隔线
 col_chart1, col_chart2 = st.columns(2)
 
@@ -97,7 +135,7 @@ MACARON_LIGHT_BLUE = "#A8D1E7"
 # 按小时划分的销售额
 with col_chart1:
     st.write("按小时划分的销售额")
-    hour_sales = df_filtered.groupby("hour")["sales"].sum().reset_index()
+    hour_sales = cube_slice.sales_by_hour()
     st.bar_chart(
         hour_sales, 
         x="hour", 
@@ -109,7 +147,7 @@ with col_chart1:
 # 按产品类型划分的销售额
 with col_chart2:
     st.write("按产品类型划分的销售额")
-    product_sales = df_filtered.groupby("product_type")["sales"].sum().sort_values(ascending=False).reset_index()
+    product_sales = cube_slice.sales_by_product()
     st.bar_chart(
         product_sales, 
         x="product_type", 
@@ -120,13 +158,16 @@ with col_chart2:
 
 
 # ---------------------- 8. 数据表格展示 ----------------------
+mark_section("数据表格")
 st.divider()
 st.subheader("销售数据详情表")
 st.dataframe(
     df_filtered,
     use_container_width=True,
     column_config={
-        "sales": st.column_config.NumberColumn("销售额", format="¥%d"),
+        "sales": st.column_config.NumberColumn("销售额", format="¥%.2f"),
         "rating": st.column_config.NumberColumn("顾客评分")
     }
-)
\ No newline at end of file
+)
+
+finish_rerun()
@@ -0,0 +1,6 @@
+# 测试在仓库根目录下导入各模块、读取模型和数据文件
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# 在独立进程中运行企鹅分类应用的单条预测页面：进程内已导入的模块会影响结果
+PREDICT_SCRIPT = """
+import sys
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file('qier.py', default_timeout=60).run()
+at.sidebar.selectbox[0].set_value('预测分类页面').run()
+at.number_input[0].set_value(45.0)
+at.number_input[1].set_value(15.0)
+at.number_input[2].set_value(220.0)
+at.number_input[3].set_value(5000.0)
+at.button[0].click().run()
+assert not at.exception, at.exception
+assert any('预测该企鹅的物种名称是' in m.value for m in at.markdown)
+print('pandas' in sys.modules)
+"""
+
+
+def test_single_prediction_does_not_import_pandas():
+    result = subprocess.run([sys.executable, '-c', PREDICT_SCRIPT], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == 'False'
@@ -0,0 +1,17 @@
+import numpy as np
+
+from sketches import HyperLogLog
+
+
+def test_hyperloglog_small_counts():
+    assert HyperLogLog().count() == 0
+    assert HyperLogLog().update(range(10)).count() == 10
+
+
+def test_hyperloglog_unbiased_near_linear_counting_threshold():
+    # 4096 个寄存器时约 1 万个取值（约 2.5 倍寄存器数）处，原始估计与线性计数切换带来约 +2% 的偏差
+    rng = np.random.default_rng(0)
+    for n in (6_000, 10_000, 12_000):
+        errors = [HyperLogLog().update(rng.integers(0, 2 ** 62, n)).count() / n - 1 for _ in range(100)]
+        assert abs(np.mean(errors)) < 0.005
+        assert np.std(errors) < 0.02
@@ -0,0 +1,38 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from student_batch import AT_RISK_TIER, MISSING_TIER, TIER_COLUMN, grade_tiers, score_frame, write_chunks
+from student_model import fit_model
+
+ROSTER = pd.DataFrame({
+    "学号": [1, 2, 3, 4, 5, 6],
+    "性别": ["男", "女", "男", "女", "男", "女"],
+    "专业": ["人工智能", "工商管理", "人工智能", "工商管理", "人工智能", "工商管理"],
+    "每周学习时长（小时）": [20.0, 15.0, 5.0, 18.0, 2.0, 12.0],
+    "上课出勤率": [0.95, 0.9, 0.6, 0.92, 0.5, 0.8],
+    "期中考试分数": [92.0, 80.0, 50.0, 88.0, 40.0, 70.0],
+    "作业完成率": [0.98, 0.9, 0.5, 0.95, 0.4, 0.8],
+    "期末考试分数": [95.0, 82.0, 48.0, 90.0, 35.0, 72.0],
+})
+
+
+def test_grade_tiers_marks_nan_as_missing():
+    tiers = grade_tiers(np.array([90.0, 75.0, 65.0, 30.0, np.nan]))
+    assert tiers.tolist() == ["优秀", "良好", "及格", AT_RISK_TIER, MISSING_TIER]
+
+
+def test_row_with_missing_value_is_not_at_risk():
+    model = fit_model(ROSTER, "test")
+    roster = ROSTER.copy()
+    roster.loc[4, "期中考试分数"] = np.nan  # 原本预测为不及格风险的学生
+    scored = score_frame(roster, model)
+    assert scored.loc[4, TIER_COLUMN] == MISSING_TIER
+    assert scored.loc[2, TIER_COLUMN] == AT_RISK_TIER
+
+    out, at_risk_out = io.StringIO(), io.StringIO()
+    counts = write_chunks([scored], out, at_risk_out)
+    at_risk = pd.read_csv(io.StringIO(at_risk_out.getvalue()))
+    assert at_risk["学号"].tolist() == [3]
+    assert counts[AT_RISK_TIER] == 1 and counts[MISSING_TIER] == 1
@@ -0,0 +1,258 @@
+# 启动预热：进程启动时在后台线程中提前加载数据集和模型、构建各专业汇总与销售立方体，并对每个模型试预测一次，
+# 部署后的第一位访问者不再承担冷启动；预热进度通过本机的 /ready 接口提供给健康检查轮询
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_READY_PORT = 8610  # Streamlit 应用的就绪检查端口（预测服务直接在自己的端口上提供 /ready）
+
+# 不妨碍就绪的结束状态：文件缺失时对应页面/接口本来就只会提示缺失；出错（failed）说明数据或模型损坏，不视为就绪
+READY_STATES = ('ready', 'missing')
+
+
+@dataclass
+class TaskStatus:
+    """单个预热任务的状态"""
+    name: str
+    state: str = 'pending'  # pending / running / ready（完成）/ missing（文件缺失）/ failed（出错）
+    seconds: float = None   # 执行耗时（秒），未结束时为 None
+    error: str = None       # 文件缺失或出错时的说明
+
+
+# ---------------------- 预热任务 ----------------------
+# 各任务在后台线程中才导入对应模块，启动脚本本身不必等待 pandas、scikit-learn 等库导入完成
+def dummy_input(encoder):
+    """试预测用的一行输入：数值特征取 0，分类特征不属于任何已知取值"""
+    record = {column: 0.0 for _, column in encoder.numeric}
+    record.update({column: None for column in encoder.categories})
+    return encoder.encode_record(record)
+
+
+def warm_student():
+    """学生数据：加载数据集（大文件改为流式统计），构建各专业汇总、箱线图统计量和成绩预测模型并试预测"""
+    from chart_data import box_summaries_for
+    from student_data import COLUMNS, CSV_PATH, load_student_data
+    from student_model import score_model_for
+    from student_stats import major_stats_for
+    from student_stream import load_major_stats, should_stream
+
+    if should_stream(CSV_PATH):
+        load_major_stats(CSV_PATH)
+        return
+    df = load_student_data(CSV_PATH)
+    major_stats_for(df)
+    box_summaries_for(df, COLUMNS['major'], COLUMNS['study_hour'])
+    model = score_model_for(df, CSV_PATH)
+    model.predict(dummy_input(model.encoder))
+
+
+def warm_sales():
+    """销售数据：加载数据集，构建筛选用的位图索引和销售立方体"""
+    from bitmap_filter import bitmap_index_for
+    from sales_cube import FILTER_DIMENSIONS, cube_for
+    from sales_data import load_sales_data
+
+    df = load_sales_data()
+    bitmap_index_for(df, FILTER_DIMENSIONS)
+    cube_for(df)
+
+
+def warm_penguin():
+    """企鹅分类：加载模型和物种名称映射并试预测"""
+    from feature_encoding import encoder_for
+    from model_registry import load_artifact
+    from packed_forest import preferred_model_path
+    from penguin_model import CATEGORICAL_COLUMNS, MODEL_PATH, OUTPUT_UNIQUES_PATH
+
+    model = load_artifact(preferred_model_path(MODEL_PATH))
+    load_artifact(OUTPUT_UNIQUES_PATH)
+    model.predict_proba(dummy_input(encoder_for(model, CATEGORICAL_COLUMNS)))
+
+
+def warm_insurance():
+    """医疗费用：加载回归模型并试预测（含逐树分位数）"""
+    from feature_encoding import encoder_for
+    from forest_quantiles import predict_with_quantiles
+    from insurance_model import CATEGORICAL_COLUMNS, MODEL_PATH
+    from model_registry import load_artifact
+    from packed_forest import preferred_model_path
+
+    model = load_artifact(preferred_model_path(MODEL_PATH))
+    predict_with_quantiles(model, dummy_input(encoder_for(model, CATEGORICAL_COLUMNS)))
+
+
+TASKS = {
+    'student': warm_student,
+    'sales': warm_sales,
+    'penguin': warm_penguin,
+    'insurance': warm_insurance,
+}
+
+# 各 Streamlit 入口脚本需要预热的任务
+APP_TASKS = {
+    'student.py': ['student'],
+    'supermarket_analysis.py': ['sales'],
+    'qier.py': ['penguin'],
+    'streamlit_predict_v2.py': ['insurance'],
+}
+
+
+# ---------------------- 预热状态 ----------------------
+class Warmup:
+    """每个任务一个后台线程；预热已启动且全部任务以成功或文件缺失结束后视为就绪，任何任务出错都不就绪"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks = {}    # 任务名 -> TaskStatus
+        self._threads = []
+        self.started_at = None
+
+    def start(self, tasks):
+        """启动一组预热任务（任务名 -> 无参函数），已启动过的同名任务不重复执行"""
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+            for name, func in tasks.items():
+                if name in self._tasks:
+                    continue
+                status = self._tasks[name] = TaskStatus(name)
+                thread = threading.Thread(target=self._run, args=(status, func), name=f'warmup-{name}', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    @staticmethod
+    def _run(status, func):
+        status.state = 'running'
+        start = time.perf_counter()
+        try:
+            func()
+            status.state = 'ready'
+        except FileNotFoundError as e:
+            status.state, status.error = 'missing', f'未找到文件：{e.filename}'
+        except Exception as e:
+            status.state, status.error = 'failed', f'{type(e).__name__}: {e}'
+        finally:
+            status.seconds = round(time.perf_counter() - start, 3)
+
+    def is_ready(self):
+        if self.started_at is None:
+            return False
+        return all(status.state in READY_STATES for status in list(self._tasks.values()))
+
+    def failed(self):
+        """出错的任务名列表"""
+        return [name for name, status in list(self._tasks.items()) if status.state == 'failed']
+
+    def wait(self, timeout=None):
+        """等待全部任务结束（或超时），返回是否已就绪"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in list(self._threads):
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        return self.is_ready()
+
+    def status(self):
+        """就绪状态及各任务详情（供健康检查返回 JSON）"""
+        return {
+            'ready': self.is_ready(),
+            'failed': self.failed(),
+            'uptime_seconds': round(time.time() - self.started_at, 3) if self.started_at else 0.0,
+            'tasks': {name: asdict(status) for name, status in list(self._tasks.items())},
+        }
+
+
+# 进程级单例：与模型注册表、数据缓存一样由同一进程中的所有会话共享
+WARMUP = Warmup()
+
+
+def start_warmup(names):
+    """按名称启动默认的预热任务"""
+    WARMUP.start({name: TASKS[name] for name in names})
+
+
+# ---------------------- 就绪检查接口 ----------------------
+class ReadinessHandler(BaseHTTPRequestHandler):
+    """GET /ready（或 /health）：已就绪时返回 200，仍在预热或有任务出错时返回 503，响应体为各任务状态"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/ready', '/health'):
+            self.send_error(404)
+            return
+        status = WARMUP.status()
+        body = json.dumps(status, ensure_ascii=False).encode('utf-8')
+        self.send_response(200 if status['ready'] else 503)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 健康检查轮询频繁，不写访问日志
+
+
+def serve_readiness(host=DEFAULT_HOST, port=DEFAULT_READY_PORT):
+    """在后台线程中启动就绪检查接口，返回 HTTP 服务对象"""
+    server = ThreadingHTTPServer((host, port), ReadinessHandler)
+    threading.Thread(target=server.serve_forever, name='warmup-ready', daemon=True).start()
+    return server
+
+
+def check_ready(url, timeout=2.0):
+    """请求一次就绪检查接口，返回 (是否就绪, 状态字典)；接口无法访问时状态为 None"""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return True, json.load(response)
+    except urllib.error.HTTPError as e:
+        return False, json.load(e) if e.code == 503 else None
+    except (urllib.error.URLError, OSError, ValueError):
+        return False, None
+
+
+def run_app(script, streamlit_args, host, port):
+    """启动预热任务和就绪检查接口后，在同一进程中运行 Streamlit 应用（预热结果直接进入应用使用的进程级缓存）"""
+    from streamlit.web import cli
+
+    start_warmup(APP_TASKS.get(script.replace('\\', '/').rsplit('/', 1)[-1], []))
+    serve_readiness(host, port)
+    print(f'预热已开始，就绪检查：http://{host}:{port}/ready', file=sys.stderr)
+    sys.argv = ['streamlit', 'run', script, *streamlit_args]
+    sys.exit(cli.main())
+
+
+def main(argv=None):
+    """命令行入口：
+    python warmup.py run student.py [--ready-port 8610] [-- 传给 streamlit run 的参数，如 --server.port 8501]
+    python warmup.py check [--url http://127.0.0.1:8610/ready]
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # “--” 之后的参数原样传给 streamlit run，之前的由本脚本解析（选项可以写在入口脚本前后）
+    streamlit_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, streamlit_args = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(description='启动时后台预热缓存，并提供就绪检查')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='预热后运行 Streamlit 应用')
+    run.add_argument('script', help='Streamlit 入口脚本，如 student.py')
+    run.add_argument('--ready-host', default=DEFAULT_HOST, help='就绪检查接口的监听地址，默认只监听本机')
+    run.add_argument('--ready-port', type=int, default=DEFAULT_READY_PORT, help='就绪检查接口的端口')
+    check = commands.add_parser('check', help='请求一次就绪检查接口，就绪时退出码为 0')
+    check.add_argument('--url', default=f'http://{DEFAULT_HOST}:{DEFAULT_READY_PORT}/ready', help='就绪检查地址')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        run_app(args.script, streamlit_args, args.ready_host, args.ready_port)
+    ready, status = check_ready(args.url)
+    print(json.dumps(status, ensure_ascii=False, indent=2) if status is not None else f'无法访问 {args.url}')
+    sys.exit(0 if ready else 1)
+
+
+if __name__ == '__main__':
+    main()